@@ -1,6 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Optional, Any
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from typing import List, Optional, Any, AsyncIterator
+from bson import ObjectId
+import logging
+import json
 
+from app.config import settings
 from app.models.user import User
 from app.models.chat import (
     ChatMessage, ChatMessageCreate, Conversation, 
@@ -8,7 +14,11 @@ from app.models.chat import (
 )
 from app.repository.chat_repository import ChatRepository
 from app.dependencies import get_current_active_user, get_chat_repository
-from app.services.llm_service import generate_llm_response  # Import your LLM service
+from app.services.answer_cache import answer_cache
+from app.services.disconnect import ClientDisconnected, cancel_on_disconnect
+from app.services.llm_service import generate_llm_response, stream_llm_response  # Import your LLM service
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -155,6 +165,7 @@ async def get_messages(
 @router.post("/chat", response_model=ChatMessage)
 async def send_message(
     message: ChatMessageCreate,
+    request: Request,
     current_user: User = Depends(get_current_active_user),
     chat_repo: ChatRepository = Depends(get_chat_repository)
 ) -> Any:
@@ -182,8 +193,8 @@ async def send_message(
         # Get conversation context (for LLM)
         context = await chat_repo.get_conversation_context(message.conversation_id)
         
-        # Generate AI response using LLM service
-        ai_response = await generate_llm_response(context, str(current_user.id))
+        # Generate AI response using LLM service, abandoning it if the client leaves
+        ai_response = await cancel_on_disconnect(request, generate_llm_response(context, str(current_user.id)))
         
         # Save AI response
         ai_message = ChatMessageCreate(
@@ -195,6 +206,8 @@ async def send_message(
         assistant_message = await chat_repo.create_message(ai_message)
         
         return assistant_message
+    except ClientDisconnected:
+        raise
     except Exception as e:
         # Log the error
         logger.error(f"Error generating response: {str(e)}")
@@ -211,4 +224,99 @@ async def send_message(
         
         # Save fallback response
         assistant_message = await chat_repo.create_message(fallback_message)
-        return assistant_message 
\ No newline at end of file
+        return assistant_message
+
+@router.post("/chat/stream")
+async def send_message_stream(
+    message: ChatMessageCreate,
+    current_user: User = Depends(get_current_active_user),
+    chat_repo: ChatRepository = Depends(get_chat_repository)
+) -> StreamingResponse:
+    """
+    Send a message and stream the AI response as newline-delimited JSON.
+    
+    Emits one {"type": "token", "content": ...} line per chunk as the provider
+    produces it, then a final {"type": "message", "message": ...} line with the
+    saved assistant message once the stream finishes.
+    """
+    # Check if conversation exists and user has access
+    conversation = await chat_repo.get_conversation(message.conversation_id)
+    if not conversation:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Conversation not found"
+        )
+    
+    if conversation.user_id != str(current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this conversation"
+        )
+    
+    # Save user message
+    await chat_repo.create_message(message)
+    
+    # Get conversation context (for LLM) before the response starts streaming
+    context = await chat_repo.get_conversation_context(message.conversation_id)
+    user_id = str(current_user.id)
+    
+    async def event_stream() -> AsyncIterator[str]:
+        chunks = []
+        metadata = {"generated": True, "streamed": True}
+        
+        try:
+            async for chunk in stream_llm_response(context, user_id, fallback=False):
+                chunks.append(chunk)
+                yield json.dumps({"type": "token", "content": chunk}) + "\n"
+        except Exception as e:
+            logger.error(f"Error streaming response: {str(e)}")
+            if chunks:
+                # A partial answer is kept, flagged as cut short
+                metadata = {"generated": True, "streamed": True, "error": str(e), "partial": True}
+            else:
+                metadata = {"generated": False, "error": str(e), "fallback": True}
+                chunks.append("I apologize, but I encountered an error processing your request. Please try again later.")
+                yield json.dumps({"type": "token", "content": chunks[0]}) + "\n"
+        
+        # Persist the complete assistant message once the stream has finished
+        ai_message = ChatMessageCreate(
+            conversation_id=message.conversation_id,
+            role="assistant",  # Use lowercase to match MessageRole enum
+            content="".join(chunks),
+            metadata=metadata
+        )
+        assistant_message = await chat_repo.create_message(ai_message)
+        
+        yield json.dumps({
+            "type": "message",
+            "message": jsonable_encoder(assistant_message, custom_encoder={ObjectId: str})
+        }) + "\n"
+    
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+@router.delete("/answer-cache")
+async def invalidate_cached_answer(
+    question: str,
+    current_user: User = Depends(get_current_active_user)
+) -> Any:
+    """
+    Drop the cached generic answer that would be served for a question
+    (e.g. after it was reported as wrong or outdated).
+    
+    Cached answers are shared by every user, so only the users listed in
+    ANSWER_CACHE_ADMIN_USER_IDS may evict them.
+    """
+    admins = set(settings.ANSWER_CACHE_ADMIN_USER_IDS)
+    if current_user.user_id not in admins and str(current_user.id) not in admins:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to invalidate cached answers"
+        )
+    
+    answer_id = await answer_cache.invalidate_question(question)
+    if answer_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No cached answer for this question"
+        )
+    return {"invalidated": answer_id}
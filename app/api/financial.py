@@ -186,21 +186,24 @@ async def get_financial_profile(
     """
     user_id = str(current_user.id)
     
-    # Get all user financial data
-    demographics = await financial_repo.get_user_demographics(user_id)
-    account = await financial_repo.get_user_account(user_id)
-    credit_history = await financial_repo.get_user_credit_history(user_id)
-    investment_summary = await financial_repo.get_investment_summary(user_id)
-    transaction_summary = await financial_repo.get_transaction_summary(user_id)
+    # Get all user financial data concurrently
+    full_profile = await financial_repo.get_full_profile(user_id)
+    demographics = full_profile["demographics"]
+    account = full_profile["account"]
+    credit_history = full_profile["credit_history"]
     
     # Combine into a single profile
     profile = {
         "user_id": user_id,
-        "demographics": demographics.dict() if demographics else None,
-        "account": account.dict() if account else None,
-        "credit_history": credit_history.dict() if credit_history else None,
-        "investments": investment_summary,
-        "transactions": transaction_summary
+        "demographics": demographics.model_dump(mode="json") if demographics else None,
+        "account": account.model_dump(mode="json") if account else None,
+        "credit_history": credit_history.model_dump(mode="json") if credit_history else None,
+        "investments": full_profile["investments"],
+        "transactions": full_profile["transactions"]
     }
     
-    return profile 
\ No newline at end of file
+    # Report sections that failed or timed out instead of failing the request
+    if full_profile["errors"]:
+        profile["errors"] = full_profile["errors"]
+    
+    return profile
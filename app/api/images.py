@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Form, status
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Form, Request, status
 from fastapi.responses import JSONResponse
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import List, Optional, Dict, Any
@@ -8,6 +8,7 @@ import json
 from app.database.mongodb import get_database
 from app.models.image_analyzer import ImageAnalyzer
 from app.api.auth import get_current_user
+from app.services.disconnect import ClientDisconnected, cancel_on_disconnect
 from app.database.models import User
 
 # Configure logging
@@ -22,6 +23,7 @@ router = APIRouter(
 
 @router.post("/upload")
 async def upload_image(
+    request: Request,
     file: UploadFile = File(...),
     analysis_type: str = Form("general"),
     current_user: User = Depends(get_current_user),
@@ -51,7 +53,7 @@ async def upload_image(
         file_path = await analyzer.save_uploaded_image(contents, file.filename)
         
         # Analyze the image
-        analysis_result = await analyzer.analyze_image(contents, analysis_type)
+        analysis_result = await cancel_on_disconnect(request, analyzer.analyze_image(contents, analysis_type))
         
         # Save the analysis to the database
         analysis_doc = {
@@ -69,6 +71,8 @@ async def upload_image(
         
         return analysis_result
         
+    except ClientDisconnected:
+        raise
     except Exception as e:
         logger.error(f"Error processing image: {str(e)}")
         raise HTTPException(
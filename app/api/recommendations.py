@@ -14,6 +14,16 @@ from app.dependencies import get_current_active_user
 # Remove the prefix so it doesn't cause double prefixing
 router = APIRouter()
 
+# Created once; the engine picks up product catalog reloads itself
+_engine: Optional[RecommendationEngine] = None
+
+def get_recommendation_engine(db: AsyncIOMotorDatabase = Depends(get_database)) -> RecommendationEngine:
+    """Shared recommendation engine for the current database."""
+    global _engine
+    if _engine is None or _engine.db is not db:
+        _engine = RecommendationEngine(db)
+    return _engine
+
 class ProductRecommendation(BaseModel):
     """Product recommendation model."""
     name: str
@@ -27,35 +37,19 @@ class RecommendationsResponse(BaseModel):
 
 @router.get("/", response_model=RecommendationsResponse)
 async def get_recommendations(
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    engine: RecommendationEngine = Depends(get_recommendation_engine)
 ) -> RecommendationsResponse:
     """
     Get personalized financial product recommendations for the current user.
-    """
-    # For now, return some sample recommendations
-    # In a real implementation, this would use ML/analytics to generate personalized recommendations
-    sample_recommendations = [
-        ProductRecommendation(
-            name="High-Yield Savings Account",
-            description="A savings account with competitive interest rates and no monthly fees.",
-            reason="Based on your current savings patterns and risk profile",
-            score=95.0
-        ),
-        ProductRecommendation(
-            name="Investment Portfolio",
-            description="A diversified investment portfolio tailored to your goals.",
-            reason="Matches your long-term financial objectives",
-            score=88.0
-        ),
-        ProductRecommendation(
-            name="Travel Rewards Credit Card",
-            description="Earn points on purchases and get travel benefits.",
-            reason="Aligns with your spending habits",
-            score=75.0
-        )
-    ]
     
-    return RecommendationsResponse(products=sample_recommendations)
+    Served from the recommendations cache when it has a fresh (or, while a
+    background refresh runs, a stale) entry for the user's meta-prompt.
+    """
+    recommendations = await engine.generate_recommendations(str(current_user.id))
+    return RecommendationsResponse(
+        products=[ProductRecommendation(**recommendation.model_dump()) for recommendation in recommendations]
+    )
 
 @router.get("/test", response_model=RecommendationsResponse)
 async def get_test_recommendations() -> RecommendationsResponse:
@@ -26,6 +26,14 @@ def get_int_env(var_name, default=0):
     except (ValueError, TypeError):
         return default
 
+def get_float_env(var_name, default=0.0):
+    """Get a float environment variable, handling comment issues"""
+    val = clean_env_var(var_name, str(default))
+    try:
+        return float(val)
+    except (ValueError, TypeError):
+        return default
+
 def get_bool_env(var_name, default=False):
     """Get a boolean environment variable, handling various formats"""
     val = clean_env_var(var_name, str(default)).lower()
@@ -87,4 +95,105 @@ class Settings:
     ENABLE_ADAPTIVE_RECOMMENDATIONS: bool = get_bool_env("ENABLE_ADAPTIVE_RECOMMENDATIONS", True)
     ENABLE_MOCK_DATA: bool = get_bool_env("ENABLE_MOCK_DATA", True)  # Enable mock data by default
 
+    # Uploaded document images
+    UPLOAD_DIR: str = clean_env_var("UPLOAD_DIR", "uploads/images")
+
+    # Datasets shared by the meta-prompt and recommendation models
+    DATA_DIR: str = clean_env_var("DATA_DIR", "data")
+    DATA_CACHE_DIR: str = clean_env_var("DATA_CACHE_DIR", "data/.columnar")
+    PRODUCTS_FILE: str = clean_env_var("PRODUCTS_FILE", "data/products.csv")
+    DATASET_RELOAD_CHECK_SECONDS: int = get_int_env("DATASET_RELOAD_CHECK_SECONDS", 5)
+    PRELOAD_DATASETS: bool = get_bool_env("PRELOAD_DATASETS", False)
+    DATA_LOAD_BATCH_SIZE: int = get_int_env("DATA_LOAD_BATCH_SIZE", 5000)
+    DATA_LOAD_MAX_IN_FLIGHT: int = get_int_env("DATA_LOAD_MAX_IN_FLIGHT", 4)
+
+    # LLM provider HTTP connection pools (one shared client per provider)
+    LLM_HTTP2: bool = get_bool_env("LLM_HTTP2", True)
+    LLM_POOL_MAX_CONNECTIONS: int = get_int_env("LLM_POOL_MAX_CONNECTIONS", 20)
+    LLM_POOL_MAX_KEEPALIVE: int = get_int_env("LLM_POOL_MAX_KEEPALIVE", 10)
+    LLM_POOL_KEEPALIVE_EXPIRY: int = get_int_env("LLM_POOL_KEEPALIVE_EXPIRY", 60)
+    OPENAI_POOL_MAX_CONNECTIONS: int = get_int_env("OPENAI_POOL_MAX_CONNECTIONS", LLM_POOL_MAX_CONNECTIONS)
+    MISTRAL_POOL_MAX_CONNECTIONS: int = get_int_env("MISTRAL_POOL_MAX_CONNECTIONS", LLM_POOL_MAX_CONNECTIONS)
+    HUGGINGFACE_POOL_MAX_CONNECTIONS: int = get_int_env("HUGGINGFACE_POOL_MAX_CONNECTIONS", LLM_POOL_MAX_CONNECTIONS)
+
+    # Explicit LLM provider: "mock" or "stub" override key-based selection
+    LLM_PROVIDER: str = clean_env_var("LLM_PROVIDER", "")
+
+    # LLM provider credentials and defaults (placeholder values count as unset)
+    OPENAI_API_KEY: str = clean_env_var("OPENAI_API_KEY", "")
+    MISTRAL_API_KEY: str = clean_env_var("MISTRAL_API_KEY", "")
+    HUGGINGFACE_TOKEN: str = clean_env_var("HUGGINGFACE_TOKEN", "")
+    LLM_MODEL: str = clean_env_var("LLM_MODEL", "")
+    LLM_API_URL: str = clean_env_var("LLM_API_URL", "")
+    OPENAI_VISION_MODEL: str = clean_env_var("OPENAI_VISION_MODEL", "gpt-4o-mini")
+    LLM_MAX_TOKENS: int = get_int_env("LLM_MAX_TOKENS", 1000)
+    LLM_TEMPERATURE: float = get_float_env("LLM_TEMPERATURE", 0.7)
+    # Upper bound on a single completion, including queueing for a pooled connection
+    LLM_TIMEOUT_SECONDS: float = get_float_env("LLM_TIMEOUT_SECONDS", 60.0)
+    # Share one provider call between concurrent identical completion requests
+    LLM_SINGLE_FLIGHT_ENABLED: bool = get_bool_env("LLM_SINGLE_FLIGHT_ENABLED", True)
+
+    # Complexity-based model routing: short/simple chat turns go to the fast
+    # target, long or analytical ones to the strong target ("provider:model")
+    MODEL_ROUTING_ENABLED: bool = get_bool_env("MODEL_ROUTING_ENABLED", True)
+    MODEL_ROUTE_FAST: str = clean_env_var("MODEL_ROUTE_FAST", "mistral:mistral-tiny")
+    MODEL_ROUTE_STRONG: str = clean_env_var("MODEL_ROUTE_STRONG", "mistral:mistral-large-latest")
+    # Latest user message length (tokens) from which a turn counts as complex
+    MODEL_ROUTE_STRONG_MIN_TOKENS: int = get_int_env("MODEL_ROUTE_STRONG_MIN_TOKENS", 150)
+    # Word prefixes that mark a turn as analytical
+    MODEL_ROUTE_STRONG_KEYWORDS: List[str] = get_list_env("MODEL_ROUTE_STRONG_KEYWORDS", [
+        "analy", "portfolio", "allocation", "diversif", "rebalanc", "compare", "comparison",
+        "pros and cons", "trade-off", "tradeoff", "scenario", "projection", "forecast",
+        "strategy", "retirement plan", "step by step", "in detail",
+    ])
+
+    # In-process OpenAI-compatible stub provider (LLM_PROVIDER=stub) for capacity testing
+    LLM_STUB_TTFT_MS: float = get_float_env("LLM_STUB_TTFT_MS", 300.0)
+    LLM_STUB_TOKENS_PER_SECOND: float = get_float_env("LLM_STUB_TOKENS_PER_SECOND", 50.0)
+    LLM_STUB_RESPONSE_TOKENS: int = get_int_env("LLM_STUB_RESPONSE_TOKENS", 120)
+    LLM_STUB_ERROR_RATE: float = get_float_env("LLM_STUB_ERROR_RATE", 0.0)
+    LLM_STUB_RATE_LIMIT_PERIOD_SECONDS: float = get_float_env("LLM_STUB_RATE_LIMIT_PERIOD_SECONDS", 0.0)
+    LLM_STUB_RATE_LIMIT_BURST_SECONDS: float = get_float_env("LLM_STUB_RATE_LIMIT_BURST_SECONDS", 0.0)
+    LLM_STUB_MAX_CONCURRENCY: int = get_int_env("LLM_STUB_MAX_CONCURRENCY", 0)
+
+    # Request tracing (spans feed /api/metrics; export writes OTLP/JSON lines)
+    TRACING_ENABLED: bool = get_bool_env("TRACING_ENABLED", True)
+    TRACING_EXPORT_PATH: str = clean_env_var("TRACING_EXPORT_PATH", "")
+    TRACING_SAMPLE_RATE: float = get_float_env("TRACING_SAMPLE_RATE", 1.0)
+
+    # Logging (records are written by a background thread; LOG_FORMAT is "text" or "json")
+    LOG_LEVEL: str = clean_env_var("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = clean_env_var("LOG_FORMAT", "text")
+    # Fraction of LLM prompts logged in full at INFO level (always logged at DEBUG)
+    LOG_PROMPT_SAMPLE_RATE: float = get_float_env("LOG_PROMPT_SAMPLE_RATE", 0.0)
+    LOG_PROMPT_MAX_CHARS: int = get_int_env("LOG_PROMPT_MAX_CHARS", 4000)
+
+    # Chat prompt assembly: system prompt plus as many recent turns as fit
+    CONTEXT_MAX_PROMPT_TOKENS: int = get_int_env("CONTEXT_MAX_PROMPT_TOKENS", 6000)
+    CONTEXT_RESPONSE_RESERVE_TOKENS: int = get_int_env("CONTEXT_RESPONSE_RESERVE_TOKENS", 1000)
+    CONTEXT_MAX_HISTORY_MESSAGES: int = get_int_env("CONTEXT_MAX_HISTORY_MESSAGES", 50)
+
+    # Semantic cache of answers to generic (profile-independent) chat questions
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = get_float_env("ANSWER_CACHE_SIMILARITY_THRESHOLD", 0.92)
+    ANSWER_CACHE_TTL_SECONDS: int = get_int_env("ANSWER_CACHE_TTL_SECONDS", 86400)
+    ANSWER_CACHE_MAX_ENTRIES: int = get_int_env("ANSWER_CACHE_MAX_ENTRIES", 5000)
+    # Users (user_id or database id) allowed to evict shared cached answers
+    ANSWER_CACHE_ADMIN_USER_IDS: List[str] = get_list_env("ANSWER_CACHE_ADMIN_USER_IDS", [])
+
+    # Per-user financial context cache used to build chat system prompts
+    USER_CONTEXT_CACHE_TTL_SECONDS: int = get_int_env("USER_CONTEXT_CACHE_TTL_SECONDS", 300)
+    USER_CONTEXT_CACHE_MAX_ENTRIES: int = get_int_env("USER_CONTEXT_CACHE_MAX_ENTRIES", 10000)
+
+    # Per-section timeout for the concurrent financial profile queries
+    FINANCIAL_PROFILE_SECTION_TIMEOUT_MS: int = get_int_env("FINANCIAL_PROFILE_SECTION_TIMEOUT_MS", 2000)
+
+    # Product embedding index for recommendations
+    EMBEDDING_MODEL: str = clean_env_var("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    EMBEDDING_INDEX_DIR: str = clean_env_var("EMBEDDING_INDEX_DIR", "data/embeddings")
+
+    # Recommendation cache: entries are fresh for the TTL, then served stale
+    # (while refreshing in the background) for the stale window
+    RECOMMENDATION_CACHE_TTL_SECONDS: int = get_int_env("RECOMMENDATION_CACHE_TTL_SECONDS", 86400)
+    RECOMMENDATION_CACHE_STALE_SECONDS: int = get_int_env("RECOMMENDATION_CACHE_STALE_SECONDS", 518400)
+
 settings = Settings() 
\ No newline at end of file
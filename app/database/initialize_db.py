@@ -1,10 +1,13 @@
+import argparse
 import logging
 import asyncio
 import os
+import time
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.errors import BulkWriteError
 import pandas as pd
 from datetime import datetime, date
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Callable, Awaitable, Iterable, Iterator
 from pathlib import Path
 
 from app.config import settings
@@ -14,6 +17,8 @@ from app.repository.user_repository import UserRepository
 from app.repository.chat_repository import ChatRepository
 from app.repository.document_repository import DocumentRepository
 from app.repository.financial_repository import FinancialRepository
+from app.models.recommendation_engine import RecommendationEngine
+from app.services.columnar_cache import iter_dataset_batches
 
 # Configure logging
 logging.basicConfig(
@@ -47,12 +52,33 @@ async def connect_to_mongodb() -> AsyncIOMotorDatabase:
         raise
 
 class DataLoader:
-    """Utility class to load data from CSV files into MongoDB."""
+    """
+    Utility class to stream data from CSV files into MongoDB.
+
+    Each file is read in chunks of settings.DATA_LOAD_BATCH_SIZE rows, so
+    memory use is bounded by the batch size rather than the file size. Chunks
+    are parsed in a worker thread while earlier batches are being written, with
+    at most settings.DATA_LOAD_MAX_IN_FLIGHT unordered inserts in flight.
+
+    With sync=True, rows are upserted on their natural key instead of
+    inserted, and rows whose content hash is unchanged are skipped, so the
+    loader can be re-run against a populated database.
+    """
     
-    def __init__(self, db):
+    def __init__(
+        self,
+        db,
+        batch_size: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        sync: bool = False
+    ):
         """Initialize with database connection."""
         self.db = db
-        self.data_dir = Path("./data")
+        self.sync = sync
+        self.sync_stats: Dict[str, Dict[str, int]] = {}
+        self.data_dir = Path(settings.DATA_DIR)
+        self.batch_size = batch_size or settings.DATA_LOAD_BATCH_SIZE
+        self.max_in_flight = max_in_flight or settings.DATA_LOAD_MAX_IN_FLIGHT
         self.financial_repo = FinancialRepository(db)
         
     async def load_data(self):
@@ -63,149 +89,157 @@ class DataLoader:
         await self.load_credit_history()
         await self.load_investment_data()
         await self.load_product_data()
+        if self.sync:
+            logger.info(f"Sync results: {self.sync_stats}")
         logger.info("Completed loading all datasets")
         
     async def load_demographic_data(self):
         """Load demographic data from CSV."""
-        try:
-            csv_path = self.data_dir / "demographic_data.csv"
-            if not csv_path.exists():
-                logger.warning(f"Demographic data file not found at {csv_path}")
-                return
-                
-            df = pd.read_csv(csv_path)
-            data = df.to_dict('records')
-            
-            # Preprocess data for MongoDB
-            for item in data:
-                item["_id"] = item.get("_id", None)
-            
-            count = await self.financial_repo.bulk_load_demographics(data)
-            logger.info(f"Loaded {count} demographic records")
-            
-        except Exception as e:
-            logger.error(f"Error loading demographic data: {str(e)}")
+        return await self._load_csv(
+            "demographic_data.csv", "demographic",
+            self._writer("demographics", self.financial_repo.bulk_load_demographics)
+        )
     
     async def load_account_data(self):
         """Load account data from CSV."""
-        try:
-            csv_path = self.data_dir / "account_data.csv"
-            if not csv_path.exists():
-                logger.warning(f"Account data file not found at {csv_path}")
-                return
-                
-            df = pd.read_csv(csv_path)
-            
-            # Convert date strings to date objects
-            for date_col in ['account_opening_date']:
-                if date_col in df.columns:
-                    df[date_col] = pd.to_datetime(df[date_col]).dt.date
-                    
-            data = df.to_dict('records')
-            
-            # Preprocess data for MongoDB
-            for item in data:
-                item["_id"] = item.get("_id", None)
-            
-            count = await self.financial_repo.bulk_load_accounts(data)
-            logger.info(f"Loaded {count} account records")
-            
-        except Exception as e:
-            logger.error(f"Error loading account data: {str(e)}")
+        return await self._load_csv(
+            "account_data.csv", "account", self._writer("accounts", self.financial_repo.bulk_load_accounts),
+            date_columns=["account_opening_date"]
+        )
     
     async def load_transaction_data(self):
         """Load transaction data from CSV."""
-        try:
-            csv_path = self.data_dir / "transaction_data.csv"
-            if not csv_path.exists():
-                logger.warning(f"Transaction data file not found at {csv_path}")
-                return
-                
-            df = pd.read_csv(csv_path)
-            
-            # Convert date strings to date objects
-            if 'date' in df.columns:
-                df['date'] = pd.to_datetime(df['date']).dt.date
-                    
-            data = df.to_dict('records')
-            
-            # Preprocess data for MongoDB
-            for item in data:
-                item["_id"] = item.get("_id", None)
-            
-            count = await self.financial_repo.bulk_load_transactions(data)
-            logger.info(f"Loaded {count} transaction records")
-            
-        except Exception as e:
-            logger.error(f"Error loading transaction data: {str(e)}")
+        return await self._load_csv(
+            "transaction_data.csv", "transaction", self._writer("transactions", self.financial_repo.bulk_load_transactions),
+            date_columns=["date"]
+        )
     
     async def load_credit_history(self):
         """Load credit history data from CSV."""
-        try:
-            csv_path = self.data_dir / "credit_history.csv"
-            if not csv_path.exists():
-                logger.warning(f"Credit history file not found at {csv_path}")
-                return
-                
-            df = pd.read_csv(csv_path)
-            data = df.to_dict('records')
-            
-            # Preprocess data for MongoDB
-            for item in data:
-                item["_id"] = item.get("_id", None)
-            
-            count = await self.financial_repo.bulk_load_credit_history(data)
-            logger.info(f"Loaded {count} credit history records")
-            
-        except Exception as e:
-            logger.error(f"Error loading credit history data: {str(e)}")
+        return await self._load_csv(
+            "credit_history.csv", "credit history",
+            self._writer("credit_history", self.financial_repo.bulk_load_credit_history)
+        )
     
     async def load_investment_data(self):
         """Load investment data from CSV."""
-        try:
-            csv_path = self.data_dir / "investment_data.csv"
-            if not csv_path.exists():
-                logger.warning(f"Investment data file not found at {csv_path}")
-                return
-                
-            df = pd.read_csv(csv_path)
-            
-            # Convert date strings to date objects
-            if 'start_date' in df.columns:
-                df['start_date'] = pd.to_datetime(df['start_date']).dt.date
-                    
-            data = df.to_dict('records')
-            
-            # Preprocess data for MongoDB
-            for item in data:
-                item["_id"] = item.get("_id", None)
-            
-            count = await self.financial_repo.bulk_load_investments(data)
-            logger.info(f"Loaded {count} investment records")
-            
-        except Exception as e:
-            logger.error(f"Error loading investment data: {str(e)}")
+        return await self._load_csv(
+            "investment_data.csv", "investment", self._writer("investments", self.financial_repo.bulk_load_investments),
+            date_columns=["start_date"]
+        )
     
     async def load_product_data(self):
         """Load financial product data from CSV."""
+        return await self._load_csv("products.csv", "product", self._writer("products", self.financial_repo.bulk_load_products))
+    
+    def _writer(
+        self,
+        collection_name: str,
+        bulk_load: Callable[[List[Dict[str, Any]]], Awaitable[int]]
+    ) -> Callable[[List[Dict[str, Any]]], Awaitable[int]]:
+        """Get the batch writer for a dataset: plain insert, or upsert sync in sync mode."""
+        if not self.sync:
+            return bulk_load
+        
+        stats = self.sync_stats.setdefault(collection_name, {"inserted": 0, "updated": 0, "unchanged": 0})
+        
+        async def sync_batch(records: List[Dict[str, Any]]) -> int:
+            batch_stats = await self.financial_repo.sync_records(collection_name, records)
+            for name, count in batch_stats.items():
+                stats[name] += count
+            return len(records)
+        
+        return sync_batch
+    
+    async def _load_csv(
+        self,
+        filename: str,
+        label: str,
+        bulk_load: Callable[[List[Dict[str, Any]]], Awaitable[int]],
+        date_columns: Iterable[str] = ()
+    ) -> int:
+        """
+        Stream one CSV file into MongoDB.
+        
+        Args:
+            filename: CSV file name under the data directory
+            label: Dataset name used in log messages
+            bulk_load: Repository method that writes one batch and returns the number written
+            date_columns: Columns to convert to datetimes
+            
+        Returns:
+            Number of records loaded
+        """
+        csv_path = self.data_dir / filename
+        if not csv_path.exists():
+            logger.warning(f"{label.capitalize()} data file not found at {csv_path}")
+            return 0
+        
+        started = time.monotonic()
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        pending = set()
+        loaded = 0
+        failed = 0
+        
+        async def write_batch(records: List[Dict[str, Any]]):
+            nonlocal loaded, failed
+            try:
+                loaded += await bulk_load(records)
+            except BulkWriteError as e:
+                # Unordered inserts keep going past bad documents; count what made it in
+                inserted = e.details.get("nInserted", 0)
+                loaded += inserted
+                failed += len(records) - inserted
+                logger.error(f"Errors loading {label} batch: {len(e.details.get('writeErrors', []))} documents rejected")
+            except Exception as e:
+                failed += len(records)
+                logger.error(f"Error loading {label} batch: {str(e)}")
+            finally:
+                semaphore.release()
+        
+        batches = iter_dataset_batches(csv_path, chunksize=self.batch_size)
         try:
-            csv_path = self.data_dir / "products.csv"
-            if not csv_path.exists():
-                logger.warning(f"Products data file not found at {csv_path}")
-                return
+            while True:
+                # Parse the next chunk off the event loop so in-flight inserts keep progressing
+                records = await asyncio.to_thread(self._next_records, batches, date_columns)
+                if records is None:
+                    break
                 
-            df = pd.read_csv(csv_path)
-            data = df.to_dict('records')
-            
-            # Preprocess data for MongoDB
-            for item in data:
-                item["_id"] = item.get("_id", None)
-            
-            count = await self.financial_repo.bulk_load_products(data)
-            logger.info(f"Loaded {count} product records")
+                await semaphore.acquire()
+                task = asyncio.create_task(write_batch(records))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
             
+            if pending:
+                await asyncio.gather(*pending)
+                
         except Exception as e:
-            logger.error(f"Error loading product data: {str(e)}")
+            logger.error(f"Error loading {label} data: {str(e)}")
+            if pending:
+                await asyncio.gather(*pending)
+        
+        elapsed = time.monotonic() - started
+        rate = loaded / elapsed if elapsed > 0 else 0
+        logger.info(f"Loaded {loaded} {label} records in {elapsed:.1f}s ({rate:,.0f} rows/sec)")
+        if failed:
+            logger.warning(f"{failed} {label} records failed to load")
+        return loaded
+    
+    @staticmethod
+    def _next_records(batches: Iterator[pd.DataFrame], date_columns: Iterable[str]) -> Optional[List[Dict[str, Any]]]:
+        """Read the next chunk and convert it to MongoDB documents, or return None at the end."""
+        df = next(batches, None)
+        if df is None:
+            return None
+        
+        # Vectorized date parsing; datetimes (not dates) are what BSON can store
+        for date_col in date_columns:
+            if date_col in df.columns:
+                df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
+        
+        # NaN/NaT are not meaningful in MongoDB; store missing values as null
+        df = df.astype(object).where(df.notna(), None)
+        return df.to_dict('records')
 
 async def create_indexes(db):
     """Create indexes for all collections."""
@@ -222,11 +256,22 @@ async def create_indexes(db):
     await chat_repo.create_indexes()
     await document_repo.create_indexes()
     await financial_repo.create_indexes()
+    await RecommendationEngine.create_indexes(db)
+    
+    # Conversations from before the denormalized message counter
+    backfilled = await chat_repo.backfill_message_counts()
+    if backfilled:
+        logger.info(f"Backfilled message counts for {backfilled} conversations")
     
     logger.info("Database indexes created successfully")
 
-async def initialize_database():
-    """Initialize the database with sample data."""
+async def initialize_database(sync: bool = False):
+    """
+    Initialize the database with sample data.
+    
+    Args:
+        sync: Upsert changed rows into an already-populated database instead of inserting everything
+    """
     logger.info("Initializing database...")
     
     # Connect to MongoDB
@@ -238,7 +283,7 @@ async def initialize_database():
         await create_indexes(db)
         
         # Load data from CSV files
-        loader = DataLoader(db)
+        loader = DataLoader(db, sync=sync)
         await loader.load_data()
         
         logger.info("Database initialization completed successfully")
@@ -251,4 +296,11 @@ async def initialize_database():
         await close_mongo_connection()
 
 if __name__ == "__main__":
-    asyncio.run(initialize_database()) 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Load the CSV datasets into MongoDB")
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="Incrementally upsert new and changed rows instead of a full insert"
+    )
+    args = parser.parse_args()
+    asyncio.run(initialize_database(sync=args.sync))
@@ -0,0 +1,714 @@
+"""
+In-process MongoDB stand-in used when settings.ENABLE_MOCK_DATA is on.
+
+MockDatabase/MockCollection implement the subset of the motor API the
+repositories use, with MongoDB semantics close enough to run the full API and
+load tests without a server:
+
+- documents are stored by _id, and create_index() maintains hash indexes on
+  the (first) indexed field, which find/update/delete use for equality and
+  $in lookups instead of scanning the collection
+- find() returns a cursor with real sort/skip/limit and projection
+- insert_many, update_one/update_many ($set, $unset, $inc, $push,
+  $setOnInsert, upserts), delete_one/delete_many, count_documents,
+  bulk_write and aggregate ($match/$group/$sort/$skip/$limit/$project/$count)
+- unique indexes raise DuplicateKeyError / BulkWriteError like pymongo
+"""
+import copy
+import json
+from datetime import date, datetime
+from typing import Dict, List, Any, Optional, Tuple, Iterable, Set
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+_MISSING = object()
+
+
+def _get_field(document: Dict[str, Any], path: str) -> Any:
+    """Resolve a (possibly dotted) field path in a document."""
+    value = document
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def _set_field(document: Dict[str, Any], path: str, value: Any):
+    """Set a (possibly dotted) field path in a document, creating parents as needed."""
+    parts = path.split(".")
+    for part in parts[:-1]:
+        document = document.setdefault(part, {})
+    document[parts[-1]] = value
+
+
+def _unset_field(document: Dict[str, Any], path: str):
+    """Remove a (possibly dotted) field path from a document if present."""
+    parts = path.split(".")
+    for part in parts[:-1]:
+        document = document.get(part)
+        if not isinstance(document, dict):
+            return
+    document.pop(parts[-1], None)
+
+
+def _comparable(a: Any, b: Any):
+    """Make dates and datetimes comparable with each other, like BSON dates."""
+    if isinstance(a, date) and not isinstance(a, datetime) and isinstance(b, datetime):
+        a = datetime.combine(a, datetime.min.time())
+    if isinstance(b, date) and not isinstance(b, datetime) and isinstance(a, datetime):
+        b = datetime.combine(b, datetime.min.time())
+    return a, b
+
+
+def _index_key(value: Any) -> Any:
+    """Hashable key for an indexed value."""
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return json.dumps(value, sort_keys=True, default=str)
+
+
+def _is_operator_document(condition: Any) -> bool:
+    return isinstance(condition, dict) and any(key.startswith("$") for key in condition)
+
+
+def _match_condition(value: Any, condition: Any) -> bool:
+    """Match a single field value against a literal or an operator document."""
+    if not _is_operator_document(condition):
+        # Equality against an array field matches any element, as in MongoDB
+        if isinstance(value, list) and not isinstance(condition, list):
+            return condition in value
+        return value == condition
+
+    for operator, operand in condition.items():
+        if operator == "$in":
+            if value not in operand:
+                return False
+        elif operator == "$nin":
+            if value in operand:
+                return False
+        elif operator == "$ne":
+            if value == operand:
+                return False
+        elif operator == "$eq":
+            if value != operand:
+                return False
+        elif operator == "$exists":
+            if (value is not None) != bool(operand):
+                return False
+        elif operator in ("$gt", "$gte", "$lt", "$lte"):
+            if value is None:
+                return False
+            left, right = _comparable(value, operand)
+            try:
+                if operator == "$gt" and not left > right:
+                    return False
+                if operator == "$gte" and not left >= right:
+                    return False
+                if operator == "$lt" and not left < right:
+                    return False
+                if operator == "$lte" and not left <= right:
+                    return False
+            except TypeError:
+                return False
+        else:
+            raise NotImplementedError(f"Mock database does not support query operator {operator}")
+    return True
+
+
+def _match_document(document: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    """Check whether a document matches a MongoDB-style query."""
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            if not all(_match_document(document, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(_match_document(document, clause) for clause in condition):
+                return False
+        elif not _match_condition(_get_field(document, key), condition):
+            return False
+    return True
+
+
+def _evaluate(expression: Any, document: Dict[str, Any]) -> Any:
+    """Evaluate a simple aggregation expression ("$field" reference or literal)."""
+    if isinstance(expression, str) and expression.startswith("$"):
+        return _get_field(document, expression[1:])
+    if isinstance(expression, dict) and not _is_operator_document(expression):
+        return {key: _evaluate(value, document) for key, value in expression.items()}
+    return expression
+
+
+def _group_documents(documents: Iterable[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Apply a $group stage with $sum/$avg/$min/$max/$first/$last/$push accumulators."""
+    groups: Dict[str, Dict[str, Any]] = {}
+    values: Dict[str, Dict[str, List[Any]]] = {}
+
+    for document in documents:
+        group_id = _evaluate(spec["_id"], document)
+        key = json.dumps(group_id, sort_keys=True, default=str)
+        if key not in groups:
+            groups[key] = {"_id": group_id}
+            values[key] = {field: [] for field in spec if field != "_id"}
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            (operator, operand), = accumulator.items()
+            values[key][field].append(_evaluate(operand, document))
+
+    for key, group in groups.items():
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            operator = next(iter(accumulator))
+            items = values[key][field]
+            numbers = [item for item in items if isinstance(item, (int, float))]
+            if operator == "$sum":
+                group[field] = sum(numbers)
+            elif operator == "$avg":
+                group[field] = sum(numbers) / len(numbers) if numbers else None
+            elif operator == "$min":
+                present = [item for item in items if item is not None]
+                group[field] = min(present) if present else None
+            elif operator == "$max":
+                present = [item for item in items if item is not None]
+                group[field] = max(present) if present else None
+            elif operator == "$first":
+                group[field] = items[0] if items else None
+            elif operator == "$last":
+                group[field] = items[-1] if items else None
+            elif operator == "$push":
+                group[field] = items
+            else:
+                raise NotImplementedError(f"Mock database does not support accumulator {operator}")
+
+    return list(groups.values())
+
+
+def _sort_documents(documents: List[Dict[str, Any]], keys: List[Tuple[str, int]]) -> List[Dict[str, Any]]:
+    """Sort documents by (field, direction) pairs, applied as a stable multi-key sort."""
+    result = list(documents)
+    for field, direction in reversed(keys):
+        # Documents missing the field sort first ascending, like MongoDB's null ordering
+        present = [doc for doc in result if _get_field(doc, field) is not None]
+        missing = [doc for doc in result if _get_field(doc, field) is None]
+        present.sort(key=lambda doc: _comparable(_get_field(doc, field), datetime.min)[0], reverse=direction < 0)
+        result = missing + present if direction >= 0 else present + missing
+    return result
+
+
+def _project_document(document: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Apply an inclusion or exclusion projection."""
+    if not projection:
+        return document
+    include = {field for field, flag in projection.items() if flag and field != "_id"}
+    if include:
+        projected = {field: _get_field(document, field) for field in include if _get_field(document, field) is not None}
+        if projection.get("_id", 1) and "_id" in document:
+            projected["_id"] = document["_id"]
+        return projected
+    return {field: value for field, value in document.items() if projection.get(field, 1)}
+
+
+def _normalize_sort(key_or_list: Any, direction: Optional[int] = None) -> List[Tuple[str, int]]:
+    """Normalize pymongo-style sort arguments to (field, direction) pairs."""
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction if direction is not None else 1)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return [(field, field_direction) for field, field_direction in key_or_list]
+
+
+def _apply_update(document: Dict[str, Any], update: Dict[str, Any], is_insert: bool = False):
+    """Apply an update document ($set/$unset/$inc/$push/$setOnInsert or a replacement) in place."""
+    if not _is_operator_document(update):
+        document_id = document.get("_id")
+        document.clear()
+        document.update(copy.deepcopy(update))
+        if document_id is not None:
+            document["_id"] = document_id
+        return
+
+    for operator, fields in update.items():
+        if operator == "$set":
+            for path, value in fields.items():
+                _set_field(document, path, copy.deepcopy(value))
+        elif operator == "$setOnInsert":
+            if is_insert:
+                for path, value in fields.items():
+                    _set_field(document, path, copy.deepcopy(value))
+        elif operator == "$unset":
+            for path in fields:
+                _unset_field(document, path)
+        elif operator == "$inc":
+            for path, amount in fields.items():
+                _set_field(document, path, (_get_field(document, path) or 0) + amount)
+        elif operator == "$push":
+            for path, value in fields.items():
+                items = _get_field(document, path)
+                if items is None:
+                    items = []
+                    _set_field(document, path, items)
+                if isinstance(value, dict) and "$each" in value:
+                    items.extend(copy.deepcopy(value["$each"]))
+                else:
+                    items.append(copy.deepcopy(value))
+        else:
+            raise NotImplementedError(f"Mock database does not support update operator {operator}")
+
+
+class MockInsertOneResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+        self.acknowledged = True
+
+
+class MockInsertManyResult:
+    def __init__(self, inserted_ids: List[Any]):
+        self.inserted_ids = inserted_ids
+        self.acknowledged = True
+
+
+class MockUpdateResult:
+    def __init__(self, matched_count: int, modified_count: int, upserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+        self.acknowledged = True
+
+
+class MockDeleteResult:
+    def __init__(self, deleted_count: int):
+        self.deleted_count = deleted_count
+        self.acknowledged = True
+
+
+class MockBulkWriteResult:
+    def __init__(self):
+        self.inserted_count = 0
+        self.matched_count = 0
+        self.modified_count = 0
+        self.deleted_count = 0
+        self.upserted_ids: Dict[int, Any] = {}
+        self.acknowledged = True
+
+    @property
+    def upserted_count(self) -> int:
+        return len(self.upserted_ids)
+
+
+class MockCursor:
+    """
+    Async cursor with pymongo-style sort/skip/limit chaining.
+
+    The query runs when the cursor is first consumed, so modifiers can be
+    chained (or applied without reassignment) in any order beforehand.
+    """
+
+    def __init__(self, documents: Iterable[Dict[str, Any]], projection: Optional[Dict[str, Any]] = None):
+        self._source = documents
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+        self._results: Optional[List[Dict[str, Any]]] = None
+        self._position = 0
+
+    def sort(self, key_or_list, direction: Optional[int] = None):
+        self._sort = _normalize_sort(key_or_list, direction)
+        return self
+
+    def skip(self, skip: int):
+        self._skip = skip
+        return self
+
+    def limit(self, limit: int):
+        self._limit = limit
+        return self
+
+    def _evaluate(self) -> List[Dict[str, Any]]:
+        if self._results is None:
+            documents = list(self._source)
+            if self._sort:
+                documents = _sort_documents(documents, self._sort)
+            if self._skip:
+                documents = documents[self._skip:]
+            if self._limit:
+                documents = documents[:self._limit]
+            self._results = [copy.deepcopy(_project_document(doc, self._projection)) for doc in documents]
+        return self._results
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        results = self._evaluate()[self._position:]
+        if length:
+            results = results[:length]
+        self._position += len(results)
+        return results
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        results = self._evaluate()
+        if self._position >= len(results):
+            raise StopAsyncIteration
+        self._position += 1
+        return results[self._position - 1]
+
+
+class MockCollection:
+    """In-memory collection keyed by _id with hash indexes on declared fields."""
+
+    def __init__(self, name: str, data: List[Dict[str, Any]] = None):
+        self.name = name
+        self._documents: Dict[Any, Dict[str, Any]] = {}
+        # field -> value key -> _ids of documents with that value
+        self._indexes: Dict[str, Dict[Any, Set[Any]]] = {}
+        self._unique: Set[str] = set()
+        # _id -> insertion sequence number, to keep index hits in natural order
+        self._sequence: Dict[Any, int] = {}
+        self._next_sequence = 0
+        for document in data or []:
+            self._insert(copy.deepcopy(document))
+
+    @property
+    def data(self) -> List[Dict[str, Any]]:
+        """All stored documents, in insertion order."""
+        return list(self._documents.values())
+
+    # Indexes
+
+    async def create_index(self, keys, unique: bool = False, **kwargs) -> str:
+        """Index the first field of keys; unique indexes are enforced on insert and update."""
+        fields = _normalize_sort(keys)
+        field = fields[0][0]
+        if field != "_id" and field not in self._indexes:
+            index: Dict[Any, Set[Any]] = {}
+            for document_id, document in self._documents.items():
+                index.setdefault(_index_key(_get_field(document, field)), set()).add(document_id)
+            self._indexes[field] = index
+        if unique and len(fields) == 1 and field != "_id":
+            duplicates = [key for key, ids in self._indexes[field].items() if key is not None and len(ids) > 1]
+            if duplicates:
+                raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {field}_1")
+            self._unique.add(field)
+        return kwargs.get("name") or "_".join(f"{name}_{direction}" for name, direction in fields)
+
+    async def drop_index(self, index_or_name):
+        """Drop an index given its name ("field_1") or its keys."""
+        if isinstance(index_or_name, str):
+            field = index_or_name.rsplit("_", 1)[0]
+        else:
+            field = _normalize_sort(index_or_name)[0][0]
+        if field not in self._indexes:
+            raise OperationFailure(f"index not found with name [{index_or_name}]")
+        del self._indexes[field]
+        self._unique.discard(field)
+
+    def _index_add(self, document: Dict[str, Any]):
+        for field, index in self._indexes.items():
+            index.setdefault(_index_key(_get_field(document, field)), set()).add(document["_id"])
+
+    def _index_remove(self, document: Dict[str, Any]):
+        for field, index in self._indexes.items():
+            key = _index_key(_get_field(document, field))
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(document["_id"])
+                if not ids:
+                    del index[key]
+
+    def _check_unique(self, document: Dict[str, Any], ignore_id: Any = _MISSING):
+        if document["_id"] in self._documents and document["_id"] != ignore_id:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: _id_")
+        for field in self._unique:
+            value = _get_field(document, field)
+            if value is None:
+                continue
+            owners = self._indexes[field].get(_index_key(value), set()) - {ignore_id}
+            if owners:
+                raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {field}_1")
+
+    def _candidates(self, query: Optional[Dict[str, Any]]) -> Iterable[Dict[str, Any]]:
+        """Documents that may match the query, narrowed by _id or the most selective index."""
+        if not query:
+            return list(self._documents.values())
+
+        best: Optional[Set[Any]] = None
+        for field, condition in query.items():
+            if field != "_id" and field not in self._indexes:
+                continue
+            if _is_operator_document(condition):
+                if set(condition) != {"$in"}:
+                    continue
+                values = condition["$in"]
+            else:
+                values = [condition]
+
+            if field == "_id":
+                ids = {value for value in values if _index_key(value) in self._documents}
+            else:
+                ids = set()
+                for value in values:
+                    ids |= self._indexes[field].get(_index_key(value), set())
+            if best is None or len(ids) < len(best):
+                best = ids
+
+        if best is None:
+            return list(self._documents.values())
+        # Return index hits in insertion order, like a collection scan would
+        return [self._documents[doc_id] for doc_id in sorted(best, key=self._sequence.__getitem__)]
+
+    def _matching(self, query: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [doc for doc in self._candidates(query) if _match_document(doc, query)]
+
+    # Reads
+
+    def find(self, query: Dict[str, Any] = None, projection: Dict[str, Any] = None) -> MockCursor:
+        return MockCursor(self._matching(query), projection)
+
+    async def find_one(self, query: Dict[str, Any] = None, projection: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
+        for document in self._candidates(query):
+            if _match_document(document, query):
+                return copy.deepcopy(_project_document(document, projection))
+        return None
+
+    async def count_documents(self, query: Dict[str, Any] = None, **kwargs) -> int:
+        if not query:
+            return len(self._documents)
+        return len(self._matching(query))
+
+    async def estimated_document_count(self, **kwargs) -> int:
+        return len(self._documents)
+
+    async def distinct(self, key: str, query: Dict[str, Any] = None) -> List[Any]:
+        values = []
+        seen = set()
+        for document in self._matching(query):
+            value = _get_field(document, key)
+            if value is not None and _index_key(value) not in seen:
+                seen.add(_index_key(value))
+                values.append(value)
+        return values
+
+    def aggregate(self, pipeline: List[Dict[str, Any]]) -> MockCursor:
+        """Run an aggregation pipeline supporting $match, $group, $sort, $skip, $limit, $project and $count."""
+        documents: Optional[List[Dict[str, Any]]] = None
+        for stage in pipeline:
+            (operator, spec), = stage.items()
+            if documents is None:
+                # A leading $match can use the indexes
+                if operator == "$match":
+                    documents = self._matching(spec)
+                    continue
+                documents = list(self._documents.values())
+
+            if operator == "$match":
+                documents = [doc for doc in documents if _match_document(doc, spec)]
+            elif operator == "$group":
+                documents = _group_documents(documents, spec)
+            elif operator == "$sort":
+                documents = _sort_documents(documents, list(spec.items()))
+            elif operator == "$skip":
+                documents = documents[spec:]
+            elif operator == "$limit":
+                documents = documents[:spec]
+            elif operator == "$project":
+                documents = [_project_document(doc, spec) for doc in documents]
+            elif operator == "$count":
+                documents = [{spec: len(documents)}] if documents else []
+            else:
+                raise NotImplementedError(f"Mock database does not support pipeline stage {operator}")
+
+        if documents is None:
+            documents = list(self._documents.values())
+        return MockCursor(documents)
+
+    # Writes
+
+    def _insert(self, document: Dict[str, Any]) -> Any:
+        if document.get("_id") is None:
+            document["_id"] = ObjectId()
+        self._check_unique(document)
+        self._documents[document["_id"]] = document
+        self._sequence[document["_id"]] = self._next_sequence
+        self._next_sequence += 1
+        self._index_add(document)
+        return document["_id"]
+
+    async def insert_one(self, document: Dict[str, Any]) -> MockInsertOneResult:
+        stored = copy.deepcopy(document)
+        inserted_id = self._insert(stored)
+        # pymongo sets the generated _id on the caller's document
+        document["_id"] = inserted_id
+        return MockInsertOneResult(inserted_id)
+
+    async def insert_many(self, documents: List[Dict[str, Any]], ordered: bool = True, **kwargs) -> MockInsertManyResult:
+        inserted_ids = []
+        write_errors = []
+        for position, document in enumerate(documents):
+            stored = copy.deepcopy(document)
+            try:
+                inserted_id = self._insert(stored)
+            except DuplicateKeyError as e:
+                write_errors.append({"index": position, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+                continue
+            document["_id"] = inserted_id
+            inserted_ids.append(inserted_id)
+
+        if write_errors:
+            raise BulkWriteError({"writeErrors": write_errors, "nInserted": len(inserted_ids)})
+        return MockInsertManyResult(inserted_ids)
+
+    def _update_document(self, document: Dict[str, Any], update: Dict[str, Any]) -> bool:
+        """Apply an update to a stored document, keeping indexes in sync. Returns whether it changed."""
+        updated = copy.deepcopy(document)
+        _apply_update(updated, update)
+        if updated == document:
+            return False
+        self._check_unique(updated, ignore_id=document["_id"])
+        self._index_remove(document)
+        document.clear()
+        document.update(updated)
+        self._index_add(document)
+        return True
+
+    def _upsert(self, query: Dict[str, Any], update: Dict[str, Any]) -> Any:
+        """Insert a document built from the query's equality conditions plus the update."""
+        document = {
+            field: copy.deepcopy(condition)
+            for field, condition in query.items()
+            if not field.startswith("$") and not _is_operator_document(condition)
+        }
+        _apply_update(document, update, is_insert=True)
+        return self._insert(document)
+
+    async def update_one(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False, **kwargs) -> MockUpdateResult:
+        for document in self._candidates(query):
+            if _match_document(document, query):
+                modified = self._update_document(document, update)
+                return MockUpdateResult(1, int(modified))
+        if upsert:
+            return MockUpdateResult(0, 0, self._upsert(query, update))
+        return MockUpdateResult(0, 0)
+
+    async def update_many(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False, **kwargs) -> MockUpdateResult:
+        documents = self._matching(query)
+        if not documents and upsert:
+            return MockUpdateResult(0, 0, self._upsert(query, update))
+        modified = sum(self._update_document(document, update) for document in documents)
+        return MockUpdateResult(len(documents), modified)
+
+    async def replace_one(self, query: Dict[str, Any], replacement: Dict[str, Any], upsert: bool = False, **kwargs) -> MockUpdateResult:
+        return await self.update_one(query, replacement, upsert=upsert)
+
+    def _delete(self, document: Dict[str, Any]):
+        self._index_remove(document)
+        del self._documents[document["_id"]]
+        del self._sequence[document["_id"]]
+
+    async def delete_one(self, query: Dict[str, Any], **kwargs) -> MockDeleteResult:
+        for document in self._candidates(query):
+            if _match_document(document, query):
+                self._delete(document)
+                return MockDeleteResult(1)
+        return MockDeleteResult(0)
+
+    async def delete_many(self, query: Dict[str, Any], **kwargs) -> MockDeleteResult:
+        documents = self._matching(query)
+        for document in documents:
+            self._delete(document)
+        return MockDeleteResult(len(documents))
+
+    async def bulk_write(self, requests: List[Any], ordered: bool = True, **kwargs) -> MockBulkWriteResult:
+        """Apply pymongo InsertOne/UpdateOne/UpdateMany/ReplaceOne/DeleteOne/DeleteMany requests."""
+        result = MockBulkWriteResult()
+        write_errors = []
+        for position, request in enumerate(requests):
+            operation = type(request).__name__
+            try:
+                if operation == "InsertOne":
+                    await self.insert_one(request._doc)
+                    result.inserted_count += 1
+                elif operation in ("UpdateOne", "UpdateMany", "ReplaceOne"):
+                    method = self.update_many if operation == "UpdateMany" else self.update_one
+                    update_result = await method(request._filter, request._doc, upsert=bool(request._upsert))
+                    result.matched_count += update_result.matched_count
+                    result.modified_count += update_result.modified_count
+                    if update_result.upserted_id is not None:
+                        result.upserted_ids[position] = update_result.upserted_id
+                elif operation in ("DeleteOne", "DeleteMany"):
+                    method = self.delete_many if operation == "DeleteMany" else self.delete_one
+                    result.deleted_count += (await method(request._filter)).deleted_count
+                else:
+                    raise NotImplementedError(f"Mock database does not support bulk operation {operation}")
+            except DuplicateKeyError as e:
+                write_errors.append({"index": position, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+
+        if write_errors:
+            raise BulkWriteError({
+                "writeErrors": write_errors,
+                "nInserted": result.inserted_count,
+                "nUpserted": result.upserted_count,
+                "nMatched": result.matched_count,
+                "nModified": result.modified_count,
+                "nRemoved": result.deleted_count,
+                "upserted": [{"index": index, "_id": _id} for index, _id in result.upserted_ids.items()],
+            })
+        return result
+
+    async def drop(self):
+        self._documents.clear()
+        self._sequence.clear()
+        for index in self._indexes.values():
+            index.clear()
+
+
+class MockDatabase:
+    """In-memory database; collections are created on first access by item or attribute."""
+
+    def __init__(self):
+        self.collections = {
+            "users": MockCollection("users", [
+                {"_id": "1", "user_id": "testuser", "hashed_password": "$2b$12$EixZaYVK1fsbw1ZfbX3OXePaWxn96p36WQoeG6Lruj3vjPGga31lW", "full_name": "Test User", "email": "test@example.com"}
+            ]),
+            "account_data": MockCollection("account_data"),
+            "credit_history": MockCollection("credit_history"),
+            "demographic_data": MockCollection("demographic_data"),
+            "investment_data": MockCollection("investment_data"),
+            "transaction_data": MockCollection("transaction_data"),
+            "products": MockCollection("products"),
+        }
+
+    def __getitem__(self, name: str) -> MockCollection:
+        if name not in self.collections:
+            self.collections[name] = MockCollection(name)
+        return self.collections[name]
+
+    def __getattr__(self, name: str) -> MockCollection:
+        # Only called for names that aren't real attributes (db.products, db.meta_prompts, ...)
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def list_collection_names(self) -> List[str]:
+        return list(self.collections.keys())
+
+    async def create_collection(self, name: str, **kwargs) -> MockCollection:
+        return self[name]
+
+    async def drop_collection(self, name: str):
+        self.collections.pop(name, None)
+
+    async def command(self, command):
+        # Mock ping command
+        if command == "ping" or (isinstance(command, dict) and "ping" in command):
+            return {"ok": 1}
+        return {"ok": 0}
@@ -1,24 +1,36 @@
 import logging
 from fastapi import FastAPI, HTTPException, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from fastapi.staticfiles import StaticFiles
 from app.database.mongodb import connect_to_mongo, close_mongo_connection
+from app.services.http_clients import init_http_clients, close_http_clients
+from app.services.llm_service import generate_llm_response
+from app.services.logging_pipeline import setup_logging, shutdown_logging
+from app.services.dataset_registry import preload_datasets
+from app.services.disconnect import CLIENT_CLOSED_REQUEST, ClientDisconnected
+from app.services.metrics import registry as metrics_registry
+from app.services.tracing import init_tracing, shutdown_tracing, span
 from app.config import settings
+from app.dependencies import get_current_active_user
+from app.models.user import User
 import os
+import time
 
 # Import API routers
 from app.api.auth import router as auth_router
 from app.api.chat import router as chat_router
 from app.api.recommendations import router as recommendations_router
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO if not settings.DEBUG else logging.DEBUG,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+# Configure logging (non-blocking: records are written by a background thread)
+setup_logging()
 logger = logging.getLogger(__name__)
 
+# Load shared datasets at import time so that, when served with a pre-forking
+# server (gunicorn --preload), workers share the parsed frames copy-on-write
+if settings.PRELOAD_DATASETS:
+    preload_datasets()
+
 # Create FastAPI application
 app = FastAPI(
     title=settings.APP_NAME,
@@ -37,19 +49,53 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# Mount static files (when the frontend build has been copied in)
+if os.path.isdir("app/static"):
+    app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
 # Register startup and shutdown events
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting up the Financial Advisor API")
+    init_tracing()
     await connect_to_mongo()
+    await init_http_clients()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down the Financial Advisor API")
+    await close_http_clients()
     await close_mongo_connection()
+    shutdown_tracing()
+    shutdown_logging()
+
+request_duration = metrics_registry.histogram(
+    "app_http_request_duration_seconds",
+    "HTTP request duration by route",
+    ["method", "route", "status"],
+)
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Open the root span of each request's trace and record its duration."""
+    started = time.perf_counter()
+    with span("http.request", method=request.method, path=request.url.path) as request_span:
+        response = await call_next(request)
+        request_span.set_attribute("status_code", response.status_code)
+    # Label by route template, not raw path, to keep label cardinality bounded
+    route = request.scope.get("route")
+    request_duration.observe(
+        time.perf_counter() - started,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=str(response.status_code),
+    )
+    return response
+
+@app.exception_handler(ClientDisconnected)
+async def client_disconnected_handler(request: Request, exc: ClientDisconnected):
+    """Nobody is listening; record the abandoned request without logging an error."""
+    return Response(status_code=CLIENT_CLOSED_REQUEST)
 
 # Include API routers
 app.include_router(auth_router, prefix="/api/auth", tags=["Authentication"])
@@ -58,17 +104,18 @@ app.include_router(recommendations_router, prefix="/api/recommendations", tags=[
 
 # Simple chat endpoint for testing
 @app.post("/api/chat/send")
-async def send_chat_message(request: Request):
+async def send_chat_message(request: Request, current_user: User = Depends(get_current_active_user)):
     try:
         data = await request.json()
         message = data.get("message", "")
         session_id = data.get("session_id")
         
-        response_text = f"You said: {message}"
-        if "invest" in message.lower():
-            response_text = "Based on your profile, I recommend considering our diversified index funds."
-        elif "saving" in message.lower():
-            response_text = "Our high-yield savings account offers 2.15% APY, which is ideal for emergency funds."
+        # Lookups (e.g. product rates) are answered by the intent router inside
+        # generate_llm_response; only open-ended questions reach the provider,
+        # billed to and personalized for the signed-in user
+        response_text = await generate_llm_response(
+            [{"role": "user", "content": message}], str(current_user.id)
+        )
         
         return {
             "text": response_text,
@@ -84,6 +131,11 @@ async def send_chat_message(request: Request):
 async def health_check():
     return {"status": "ok", "app_name": settings.APP_NAME, "version": settings.APP_VERSION}
 
+# Prometheus metrics: per-stage latency histograms, pool and cache statistics
+@app.get("/api/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 # Root route redirects to documentation or static home page
 @app.get("/")
 async def root():
@@ -43,6 +43,8 @@ class Conversation(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     is_active: bool = True
+    # Maintained atomically by ChatRepository.create_message/delete_message
+    message_count: int = 0
     metadata: Dict[str, Any] = Field(default_factory=dict)
     
     class Config:
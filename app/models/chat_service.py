@@ -2,13 +2,15 @@ import logging
 import json
 from datetime import datetime
 from typing import List, Dict, Any, Optional
-import openai
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from app.config import settings
 from app.models.conversation import Message, MessageRole, Conversation
 from app.repository.conversation_repository import ConversationRepository
 from app.models.meta_prompt_generator import MetaPromptGenerator
+from app.services.context_builder import pack_messages
+from app.services.llm_service import LLMService
+from app.services.model_router import choose_route
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -21,8 +23,8 @@ class ChatService:
         """Initialize the chat service."""
         self.conversation_repo = ConversationRepository(db)
         self.meta_prompt_generator = meta_prompt_generator
-        self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
-        self.model = settings.OPENAI_MODEL
+        self.llm = LLMService()
+        self.model = self.llm.model
         
     async def generate_response(self, conversation_id: str, user_id: str) -> Optional[Message]:
         """Generate a response to the conversation."""
@@ -36,11 +38,16 @@ class ChatService:
             # Get or create meta-prompt for this user
             meta_prompt = await self._get_or_create_meta_prompt(user_id, conversation)
             
+            # Send simple turns to the fast model and analytical ones to the strong model
+            history = self._recent_history(conversation)
+            route = choose_route(history)
+            _, model = self.llm.route_target(route)
+            
             # Prepare messages for the LLM
-            messages = self._prepare_messages(conversation, meta_prompt)
+            messages = self._prepare_messages(history, meta_prompt, model)
             
             # Call the LLM to generate a response
-            response = await self._call_llm(messages)
+            response = await self._call_llm(messages, route)
             if not response:
                 return Message(
                     role=MessageRole.ASSISTANT,
@@ -88,44 +95,34 @@ class ChatService:
         # Default meta-prompt if no generator
         return "You are a helpful assistant for a financial advisor application."
     
-    def _prepare_messages(self, conversation: Conversation, meta_prompt: str) -> List[Dict[str, Any]]:
-        """Prepare the messages for the LLM."""
-        messages = []
-        
-        # Add system message with user context (meta-prompt)
-        messages.append({
-            "role": "system",
-            "content": meta_prompt
-        })
-        
-        # Add the last 10 messages from the conversation to maintain context
-        recent_messages = conversation.messages[-10:] if len(conversation.messages) > 10 else conversation.messages
-        
-        for msg in recent_messages:
-            messages.append({
-                "role": msg.role.value,
-                "content": msg.content
-            })
-        
-        return messages
+    def _recent_history(self, conversation: Conversation) -> List[Dict[str, Any]]:
+        """The conversation's most recent turns as chat messages."""
+        return [
+            {"role": msg.role.value, "content": msg.content}
+            for msg in conversation.messages[-settings.CONTEXT_MAX_HISTORY_MESSAGES:]
+        ]
+    
+    def _prepare_messages(
+        self,
+        history: List[Dict[str, Any]],
+        meta_prompt: str,
+        model: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Prepare the messages for the LLM: the meta-prompt plus the recent turns that fit the model's budget."""
+        return pack_messages(meta_prompt, history, model or self.model)
     
-    async def _call_llm(self, messages: List[Dict[str, Any]]) -> Optional[str]:
+    async def _call_llm(self, messages: List[Dict[str, Any]], route: Optional[str] = None) -> Optional[str]:
         """Call the LLM to generate a response."""
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
+            return await self.llm.complete(
+                messages,
+                route=route,
                 temperature=0.7,
                 max_tokens=1000,
                 top_p=1.0,
                 frequency_penalty=0.0,
                 presence_penalty=0.0
             )
-            
-            # Extract the assistant's response
-            if response.choices and len(response.choices) > 0:
-                return response.choices[0].message.content
-            return None
         except Exception as e:
             logger.error(f"Error calling LLM: {str(e)}")
-            return None 
\ No newline at end of file
+            return None 
@@ -0,0 +1,216 @@
+import hashlib
+import json
+import logging
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from app.config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Indexes already opened in this process, keyed by content hash
+_loaded_indexes: Dict[str, "EmbeddingIndex"] = {}
+
+
+@lru_cache(maxsize=1)
+def get_embedding_model():
+    """Load the sentence-transformers model once per process."""
+    from sentence_transformers import SentenceTransformer
+
+    logger.info(f"Loading embedding model {settings.EMBEDDING_MODEL}")
+    return SentenceTransformer(settings.EMBEDDING_MODEL)
+
+
+def compute_content_hash(path: Path) -> str:
+    """Hash a source file together with the embedding model that indexes it."""
+    digest = hashlib.sha256()
+    digest.update(settings.EMBEDDING_MODEL.encode("utf-8"))
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class EmbeddingIndex:
+    """
+    Persistent embedding index for a small document corpus (the product catalog).
+
+    Embeddings are stored as a normalized float32 NumPy matrix (.npy) next to a
+    JSON sidecar holding the texts and metadata. Files are named after a content
+    hash of the source file, so the index is rebuilt only when the source
+    changes, and the matrix is memory-mapped so every worker process shares the
+    same pages instead of re-running model inference at startup.
+    """
+
+    def __init__(self, embeddings: np.ndarray, texts: List[str], metadatas: List[Dict[str, Any]], content_hash: str):
+        self.embeddings = embeddings
+        self.texts = texts
+        self.metadatas = metadatas
+        self.content_hash = content_hash
+
+    @classmethod
+    def load_or_build(
+        cls,
+        name: str,
+        source_path: Path,
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        index_dir: Optional[Path] = None
+    ) -> "EmbeddingIndex":
+        """
+        Load the index for the current contents of source_path, building it first if needed.
+
+        Args:
+            name: Index name, used as the file prefix
+            source_path: File the texts were read from; its hash keys the index
+            texts: Documents to embed when the index has to be built
+            metadatas: Metadata for each document
+            index_dir: Directory holding index files (defaults to settings.EMBEDDING_INDEX_DIR)
+
+        Returns:
+            The loaded index
+        """
+        content_hash = compute_content_hash(source_path)
+        if content_hash in _loaded_indexes:
+            return _loaded_indexes[content_hash]
+
+        index_dir = Path(index_dir or settings.EMBEDDING_INDEX_DIR)
+        matrix_path = index_dir / f"{name}-{content_hash[:16]}.npy"
+        sidecar_path = index_dir / f"{name}-{content_hash[:16]}.json"
+
+        # The sidecar is written last, so its presence marks a complete index
+        if not sidecar_path.exists() or not matrix_path.exists():
+            cls._build(name, content_hash, texts, metadatas, index_dir, matrix_path, sidecar_path)
+
+        with open(sidecar_path, "r", encoding="utf-8") as f:
+            sidecar = json.load(f)
+
+        embeddings = np.load(matrix_path, mmap_mode="r")
+        logger.info(f"Loaded {name} embedding index with {embeddings.shape[0]} vectors from {matrix_path}")
+
+        index = cls(embeddings, sidecar["texts"], sidecar["metadatas"], content_hash)
+        _loaded_indexes[content_hash] = index
+        return index
+
+    @staticmethod
+    def _build(
+        name: str,
+        content_hash: str,
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        index_dir: Path,
+        matrix_path: Path,
+        sidecar_path: Path
+    ):
+        """Embed the texts and write the matrix and sidecar atomically."""
+        logger.info(f"Building {name} embedding index for {len(texts)} documents")
+        os.makedirs(index_dir, exist_ok=True)
+
+        model = get_embedding_model()
+        embeddings = model.encode(texts, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+        # Write to process-unique temp files and rename, so concurrent builders
+        # in other workers never observe a partially written index
+        suffix = f".{os.getpid()}.tmp"
+        tmp_matrix = matrix_path.with_name(matrix_path.name + suffix)
+        tmp_sidecar = sidecar_path.with_name(sidecar_path.name + suffix)
+
+        with open(tmp_matrix, "wb") as f:
+            np.save(f, embeddings)
+        os.replace(tmp_matrix, matrix_path)
+
+        with open(tmp_sidecar, "w", encoding="utf-8") as f:
+            json.dump({
+                "name": name,
+                "content_hash": content_hash,
+                "model": settings.EMBEDDING_MODEL,
+                "dimension": int(embeddings.shape[1]) if embeddings.ndim == 2 else 0,
+                "texts": texts,
+                "metadatas": metadatas,
+            }, f, default=str)
+        os.replace(tmp_sidecar, sidecar_path)
+
+        # Remove indexes built from previous versions of the source file
+        for stale in index_dir.glob(f"{name}-*"):
+            if stale not in (matrix_path, sidecar_path) and not stale.name.endswith(".tmp"):
+                try:
+                    stale.unlink()
+                except OSError:
+                    pass
+
+    def similarity_search(self, query: str, k: int = 4) -> List[Dict[str, Any]]:
+        """
+        Find the k documents most similar to the query.
+
+        Returns:
+            List of {"page_content", "metadata", "score"} dicts, best match first
+        """
+        return self.batch_similarity_search([query], k=k)[0]
+
+    def batch_similarity_search(
+        self,
+        queries: List[str],
+        k: int = 4,
+        batch_size: int = 64,
+        chunk_size: int = 4096
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Find the k most similar documents for many queries at once.
+
+        All queries are encoded in batched model forward passes, then scored
+        with one matrix multiply per chunk of queries and reduced to the top k
+        with argpartition, so cost grows with the number of queries rather than
+        with per-query Python overhead.
+
+        Args:
+            queries: Query texts
+            k: Number of results per query
+            batch_size: Encoder batch size
+            chunk_size: Queries scored per matrix multiply, bounding the score matrix size
+
+        Returns:
+            One result list per query, each best match first
+        """
+        if not queries:
+            return []
+        if len(self.texts) == 0 or k <= 0:
+            return [[] for _ in queries]
+
+        query_embeddings = get_embedding_model().encode(
+            queries, batch_size=batch_size, normalize_embeddings=True, convert_to_numpy=True
+        ).astype(np.float32)
+
+        k = min(k, len(self.texts))
+        results = []
+        for start in range(0, len(queries), chunk_size):
+            # Embeddings are normalized, so the dot product is the cosine similarity
+            scores = query_embeddings[start:start + chunk_size] @ self.embeddings.T
+
+            if k < scores.shape[1]:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            else:
+                top = np.broadcast_to(np.arange(scores.shape[1]), scores.shape).copy()
+
+            # argpartition leaves the top k unordered; sort just those k per row
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+            for row_indices, row_scores in zip(top, top_scores):
+                results.append([
+                    {
+                        "page_content": self.texts[i],
+                        "metadata": self.metadatas[i],
+                        "score": float(score),
+                    }
+                    for i, score in zip(row_indices, row_scores)
+                ])
+
+        return results
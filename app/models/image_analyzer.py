@@ -1,14 +1,15 @@
+import asyncio
 import logging
 import base64
 import os
 from pathlib import Path
 from io import BytesIO
 from typing import Dict, Any, List, Optional, Tuple
-import openai
 from PIL import Image
 import numpy as np
 
 from app.config import settings
+from app.services.llm_service import LLMService
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -22,7 +23,7 @@ class ImageAnalyzer:
     
     def __init__(self):
         """Initialize the image analyzer service."""
-        openai.api_key = settings.OPENAI_API_KEY
+        self.llm = LLMService()
         self.upload_folder = Path(settings.UPLOAD_DIR)
         os.makedirs(self.upload_folder, exist_ok=True)
     
@@ -37,17 +38,21 @@ class ImageAnalyzer:
         Returns:
             Dictionary containing the extracted information
         """
+        provider = self.llm.vision_provider
+        if provider is None:
+            logger.warning("Image analysis requested but no vision-capable LLM provider is configured")
+            return {"error": "Image analysis is not configured", "analysis_type": analysis_type, "success": False}
+        
         try:
-            # Encode image to base64
-            base64_image = self._encode_image(image_data)
+            # Encode image to base64 (PIL resize/re-encode is CPU-bound, keep it off the event loop)
+            base64_image = await asyncio.to_thread(self._encode_image, image_data)
             
             # Get prompts based on analysis type
             system_prompt, user_prompt = self._get_prompts_for_analysis_type(analysis_type)
             
-            # Call OpenAI Vision API
-            response = await openai.ChatCompletion.acreate(
-                model=settings.OPENAI_VISION_MODEL,
-                messages=[
+            # Call the vision model
+            response_text = await self.llm.complete(
+                [
                     {"role": "system", "content": system_prompt},
                     {
                         "role": "user",
@@ -62,11 +67,13 @@ class ImageAnalyzer:
                         ]
                     }
                 ],
+                provider=provider,
+                model=settings.OPENAI_VISION_MODEL if provider == "openai" else None,
                 max_tokens=1000
             )
             
             # Parse the response
-            result = self._parse_response(response.choices[0].message.content, analysis_type)
+            result = self._parse_response(response_text, analysis_type)
             return result
             
         except Exception as e:
@@ -8,6 +8,8 @@ from pathlib import Path
 
 from app.config import settings
 from app.utils.data_processor import DataProcessor
+from app.models.user_index import UserIndexedFrame
+from app.services.dataset_registry import dataset_registry
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -20,13 +22,28 @@ class MetaPromptGenerator:
     and social media sentiment into a rich context for the LLM.
     """
     
+    # Dataset name -> CSV file under settings.DATA_DIR
+    DATASETS = {
+        "demographic": "demographic_data.csv",
+        "account": "account_data.csv",
+        "transaction": "transaction_data.csv",
+        "credit": "credit_history.csv",
+        "investment": "investment_data.csv",
+        "sentiment": "social_media_sentiment.csv",
+    }
+    
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
         self.data_processor = DataProcessor()
         self._load_datasets()
     
     def _load_datasets(self):
-        """Load the required datasets."""
+        """
+        Make sure the required datasets are loaded.
+        
+        Datasets live in the process-wide registry, so they are parsed once and
+        shared by every generator instance instead of re-read per construction.
+        """
         data_dir = Path(settings.DATA_DIR)
         
         # Ensure data directory exists
@@ -34,70 +51,24 @@ class MetaPromptGenerator:
             logger.warning(f"Data directory {data_dir} not found. Creating it.")
             os.makedirs(data_dir, exist_ok=True)
         
+        for filename in self.DATASETS.values():
+            path = data_dir / filename
+            try:
+                if dataset_registry.get_frame(path) is None:
+                    logger.warning(f"Dataset file not found at {path}")
+            except Exception as e:
+                logger.error(f"Error loading dataset {path}: {str(e)}")
+    
+    def _dataset_path(self, dataset: str) -> Path:
+        return Path(settings.DATA_DIR) / self.DATASETS[dataset]
+    
+    def _user_index(self, dataset: str) -> UserIndexedFrame:
+        """Get the shared user_id index for a dataset (reloaded if the file changed)."""
         try:
-            # Load demographic data
-            demographic_path = data_dir / "demographic_data.csv"
-            if os.path.exists(demographic_path):
-                self.demographic_df = pd.read_csv(demographic_path)
-                logger.info(f"Loaded demographic data with {len(self.demographic_df)} records")
-            else:
-                logger.warning(f"Demographic data file not found at {demographic_path}")
-                self.demographic_df = pd.DataFrame()
-            
-            # Load account data
-            account_path = data_dir / "account_data.csv"
-            if os.path.exists(account_path):
-                self.account_df = pd.read_csv(account_path)
-                logger.info(f"Loaded account data with {len(self.account_df)} records")
-            else:
-                logger.warning(f"Account data file not found at {account_path}")
-                self.account_df = pd.DataFrame()
-            
-            # Load transaction data
-            transaction_path = data_dir / "transaction_data.csv"
-            if os.path.exists(transaction_path):
-                self.transaction_df = pd.read_csv(transaction_path)
-                logger.info(f"Loaded transaction data with {len(self.transaction_df)} records")
-            else:
-                logger.warning(f"Transaction data file not found at {transaction_path}")
-                self.transaction_df = pd.DataFrame()
-            
-            # Load credit history data
-            credit_path = data_dir / "credit_history.csv"
-            if os.path.exists(credit_path):
-                self.credit_df = pd.read_csv(credit_path)
-                logger.info(f"Loaded credit history data with {len(self.credit_df)} records")
-            else:
-                logger.warning(f"Credit history file not found at {credit_path}")
-                self.credit_df = pd.DataFrame()
-            
-            # Load investment data
-            investment_path = data_dir / "investment_data.csv"
-            if os.path.exists(investment_path):
-                self.investment_df = pd.read_csv(investment_path)
-                logger.info(f"Loaded investment data with {len(self.investment_df)} records")
-            else:
-                logger.warning(f"Investment data file not found at {investment_path}")
-                self.investment_df = pd.DataFrame()
-            
-            # Load social media sentiment data
-            sentiment_path = data_dir / "social_media_sentiment.csv"
-            if os.path.exists(sentiment_path):
-                self.sentiment_df = pd.read_csv(sentiment_path)
-                logger.info(f"Loaded social media sentiment data with {len(self.sentiment_df)} records")
-            else:
-                logger.warning(f"Social media sentiment file not found at {sentiment_path}")
-                self.sentiment_df = pd.DataFrame()
-                
+            return dataset_registry.get_user_index(self._dataset_path(dataset))
         except Exception as e:
-            logger.error(f"Error loading datasets: {str(e)}")
-            # Initialize empty dataframes in case of error
-            self.demographic_df = pd.DataFrame()
-            self.account_df = pd.DataFrame()
-            self.transaction_df = pd.DataFrame()
-            self.credit_df = pd.DataFrame()
-            self.investment_df = pd.DataFrame()
-            self.sentiment_df = pd.DataFrame()
+            logger.error(f"Error loading dataset {dataset}: {str(e)}")
+            return UserIndexedFrame(pd.DataFrame())
     
     async def generate_meta_prompt(self, user_id: str) -> str:
         """
@@ -139,52 +110,16 @@ class MetaPromptGenerator:
     
     def _get_user_data(self, user_id: str) -> Dict[str, Any]:
         """Retrieve all available data for the user."""
-        result = {
-            "demographics": {},
-            "account": {},
-            "credit": {},
-            "investments": {},
-            "transactions": [],
-            "sentiment": []
+        return {
+            # Single-record datasets: the user's first row
+            "demographics": self._user_index("demographic").first(user_id),
+            "account": self._user_index("account").first(user_id),
+            "credit": self._user_index("credit").first(user_id),
+            "investments": self._user_index("investment").first(user_id),
+            # Multi-record datasets: all of the user's rows
+            "transactions": self._user_index("transaction").records(user_id),
+            "sentiment": self._user_index("sentiment").records(user_id)
         }
-        
-        # Get demographic data
-        if not self.demographic_df.empty:
-            user_demographics = self.demographic_df[self.demographic_df['user_id'] == user_id]
-            if not user_demographics.empty:
-                result["demographics"] = user_demographics.iloc[0].to_dict()
-        
-        # Get account data
-        if not self.account_df.empty:
-            user_account = self.account_df[self.account_df['user_id'] == user_id]
-            if not user_account.empty:
-                result["account"] = user_account.iloc[0].to_dict()
-        
-        # Get credit history
-        if not self.credit_df.empty:
-            user_credit = self.credit_df[self.credit_df['user_id'] == user_id]
-            if not user_credit.empty:
-                result["credit"] = user_credit.iloc[0].to_dict()
-        
-        # Get investment data
-        if not self.investment_df.empty:
-            user_investments = self.investment_df[self.investment_df['user_id'] == user_id]
-            if not user_investments.empty:
-                result["investments"] = user_investments.iloc[0].to_dict()
-        
-        # Get transaction data
-        if not self.transaction_df.empty:
-            user_transactions = self.transaction_df[self.transaction_df['user_id'] == user_id]
-            if not user_transactions.empty:
-                result["transactions"] = user_transactions.to_dict('records')
-        
-        # Get sentiment data
-        if not self.sentiment_df.empty:
-            user_sentiment = self.sentiment_df[self.sentiment_df['user_id'] == user_id]
-            if not user_sentiment.empty:
-                result["sentiment"] = user_sentiment.to_dict('records')
-        
-        return result
     
     def _format_meta_prompt(
         self,
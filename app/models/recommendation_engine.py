@@ -4,18 +4,26 @@ import pandas as pd
 import numpy as np
 import logging
 import os
+import asyncio
+import hashlib
 from pathlib import Path
-import openai
-from datetime import datetime
+from datetime import datetime, timedelta
+from pymongo.errors import OperationFailure
 
 from app.config import settings
 from app.database.models import ProductRecommendation, MetaPrompt
-from app.utils.vector_store import VectorStore
+from app.models.embedding_index import EmbeddingIndex
+from app.services.dataset_registry import dataset_registry
+from app.services.llm_service import LLMService
+from app.services.model_router import choose_route
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Strong references to in-flight background refreshes, keyed by user_id + cache key
+_refresh_tasks: Dict[str, "asyncio.Task"] = {}
+
 class RecommendationEngine:
     """
     Engine for generating personalized financial product recommendations.
@@ -24,8 +32,10 @@ class RecommendationEngine:
     
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
-        self.vector_store = VectorStore()
-        openai.api_key = settings.OPENAI_API_KEY
+        self.products_df = None
+        self.vector_store = None
+        self.llm = LLMService()
+        self._catalog_lock = asyncio.Lock()
         self._load_products()
     
     def _load_products(self):
@@ -33,15 +43,15 @@ class RecommendationEngine:
         try:
             products_path = Path(settings.PRODUCTS_FILE)
             
-            if os.path.exists(products_path):
-                self.products_df = pd.read_csv(products_path)
+            products_df = dataset_registry.get_frame(products_path)
+            
+            if products_df is not None:
+                # Shared across engines via the dataset registry; treat as read-only
+                self.products_df = products_df
                 logger.info(f"Loaded {len(self.products_df)} financial products")
                 
-                # Initialize vector store with products
-                self.vector_store.add_texts(
-                    texts=self.products_df['description'].tolist(),
-                    metadatas=[{"name": name} for name in self.products_df['name'].tolist()]
-                )
+                # Load (or build, if the products changed) the persisted embedding index
+                self._load_vector_store(products_path)
             else:
                 logger.warning(f"Products file not found at {products_path}. Creating a sample file.")
                 self._create_sample_products()
@@ -104,18 +114,85 @@ class RecommendationEngine:
         self.products_df.to_csv(settings.PRODUCTS_FILE, index=False)
         logger.info(f"Created sample products file with {len(self.products_df)} products")
         
-        # Initialize vector store with products
-        self.vector_store.add_texts(
-            texts=self.products_df['description'].tolist(),
-            metadatas=[{"name": name} for name in self.products_df['name'].tolist()]
+        # Build the embedding index for the sample products
+        self._load_vector_store(Path(settings.PRODUCTS_FILE))
+    
+    def _load_vector_store(self, products_path: Path):
+        """Load the product embedding index keyed by the products file's content hash."""
+        self.vector_store = self._build_vector_store(products_path, self.products_df)
+    
+    @staticmethod
+    def _build_vector_store(products_path: Path, products_df: pd.DataFrame) -> EmbeddingIndex:
+        """Load or build the embedding index for one version of the products frame."""
+        return EmbeddingIndex.load_or_build(
+            name="products",
+            source_path=products_path,
+            texts=products_df['description'].tolist(),
+            metadatas=[{"name": name} for name in products_df['name'].tolist()]
         )
     
+    async def _sync_catalog(self):
+        """
+        Pick up a products file the dataset registry has reloaded.
+        
+        The engine is long-lived, so the frame is looked up on every call; when
+        the registry has swapped in a new one, the embedding index (and with it
+        catalog_version, which keys the cache) is rebuilt off the event loop.
+        Until then the previous catalog keeps being served.
+        """
+        products_path = Path(settings.PRODUCTS_FILE)
+        products_df = dataset_registry.get_frame(products_path)
+        if products_df is None or products_df is self.products_df:
+            return
+        
+        async with self._catalog_lock:
+            if products_df is self.products_df:
+                return
+            try:
+                vector_store = await asyncio.to_thread(self._build_vector_store, products_path, products_df)
+            except Exception as e:
+                logger.error(f"Error rebuilding the product embedding index: {str(e)}")
+                return
+            self.products_df, self.vector_store = products_df, vector_store
+            logger.info(f"Product catalog changed: {len(products_df)} products, version {self.catalog_version[:12]}")
+    
+    @staticmethod
+    async def create_indexes(db: AsyncIOMotorDatabase):
+        """Create indexes for the recommendations cache and history."""
+        await db.recommendation_cache.create_index([("user_id", 1), ("cache_key", 1)], unique=True)
+        # Drop cache entries once they are past the stale-while-revalidate window
+        await db.recommendation_cache.create_index("expires_at", expireAfterSeconds=0)
+        
+        await db.recommendations.create_index([("user_id", 1), ("created_at", -1)])
+        try:
+            # Cache entries used to live in the history collection; their TTL
+            # index would delete history records too
+            await db.recommendations.drop_index("expires_at_1")
+        except OperationFailure:
+            pass
+    
+    @property
+    def catalog_version(self) -> str:
+        """Version of the product catalog, taken from the embedding index content hash."""
+        return self.vector_store.content_hash if self.vector_store is not None else "none"
+    
+    def _cache_key(self, meta_prompt: str) -> str:
+        """Cache key for a meta-prompt against the current product catalog."""
+        return hashlib.sha256(f"{self.catalog_version}\0{meta_prompt}".encode("utf-8")).hexdigest()
+    
     async def generate_recommendations(self, user_id: str) -> List[ProductRecommendation]:
         """
         Generate personalized product recommendations for the user.
         Returns a list of the top 3 recommended products with explanations.
+        
+        Results are cached in the recommendations collection, keyed by the
+        user's meta-prompt and the product catalog version. Fresh entries are
+        returned directly; stale entries are returned immediately while a
+        background refresh recomputes them.
         """
         try:
+            await self._sync_catalog()
+            
             # Get user meta-prompt
             meta_prompt_doc = await self.db.meta_prompts.find_one({"user_id": user_id})
             
@@ -125,27 +202,161 @@ class RecommendationEngine:
                 return self._generate_generic_recommendations()
             
             meta_prompt = meta_prompt_doc["prompt_text"]
+            cache_key = self._cache_key(meta_prompt)
             
-            # Use the vector store to retrieve relevant products
-            relevant_products = self.vector_store.similarity_search(meta_prompt, k=5)
-            
-            # Generate personalized recommendations with explanations
-            recommendations = await self._generate_personalized_recommendations(meta_prompt, relevant_products)
+            cached = await self.db.recommendation_cache.find_one({"user_id": user_id, "cache_key": cache_key})
+            if cached:
+                age = (datetime.utcnow() - cached["updated_at"]).total_seconds()
+                products = [ProductRecommendation(**product) for product in cached["products"]]
+                
+                if age < settings.RECOMMENDATION_CACHE_TTL_SECONDS:
+                    return products
+                
+                if age < settings.RECOMMENDATION_CACHE_TTL_SECONDS + settings.RECOMMENDATION_CACHE_STALE_SECONDS:
+                    self._schedule_refresh(user_id, meta_prompt, cache_key)
+                    return products
             
-            return recommendations
+            return await self._refresh_recommendations(user_id, meta_prompt, cache_key)
             
         except Exception as e:
             logger.error(f"Error generating recommendations: {str(e)}")
             # Return generic recommendations in case of error
             return self._generate_generic_recommendations()
     
+    def _schedule_refresh(self, user_id: str, meta_prompt: str, cache_key: str):
+        """Recompute a stale cache entry in the background, at most once at a time per entry."""
+        task_key = f"{user_id}:{cache_key}"
+        if task_key in _refresh_tasks:
+            return
+        
+        async def refresh():
+            try:
+                await self._refresh_recommendations(user_id, meta_prompt, cache_key)
+            except Exception as e:
+                logger.error(f"Error refreshing recommendations for user {user_id}: {str(e)}")
+            finally:
+                _refresh_tasks.pop(task_key, None)
+        
+        _refresh_tasks[task_key] = asyncio.create_task(refresh())
+    
+    async def _refresh_recommendations(self, user_id: str, meta_prompt: str, cache_key: str) -> List[ProductRecommendation]:
+        """Compute recommendations and store them in the cache."""
+        # Use the vector store to retrieve relevant products
+        relevant_products = self.vector_store.similarity_search(meta_prompt, k=5)
+        
+        try:
+            # Generate personalized recommendations with explanations
+            recommendations = await self._generate_personalized_recommendations(
+                meta_prompt, relevant_products, fallback=False
+            )
+        except Exception as e:
+            logger.error(f"Error from LLM provider: {str(e)}")
+            # Don't cache the generic fallback
+            return self._generate_generic_recommendations()
+        
+        await self.store_cached_recommendations(user_id, meta_prompt, recommendations, cache_key=cache_key)
+        await self.record_history(user_id, recommendations)
+        return recommendations
+    
+    async def store_cached_recommendations(
+        self,
+        user_id: str,
+        meta_prompt: str,
+        recommendations: List[ProductRecommendation],
+        cache_key: Optional[str] = None,
+        source: str = "online"
+    ):
+        """Write recommendations to the cache entry for this meta-prompt and catalog version."""
+        cache_key = cache_key or self._cache_key(meta_prompt)
+        now = datetime.utcnow()
+        expires_at = now + timedelta(
+            seconds=settings.RECOMMENDATION_CACHE_TTL_SECONDS + settings.RECOMMENDATION_CACHE_STALE_SECONDS
+        )
+        
+        await self.db.recommendation_cache.update_one(
+            {"user_id": user_id, "cache_key": cache_key},
+            {
+                "$set": {
+                    "products": [recommendation.model_dump() for recommendation in recommendations],
+                    "catalog_version": self.catalog_version,
+                    "source": source,
+                    "updated_at": now,
+                    "expires_at": expires_at
+                },
+                "$setOnInsert": {"created_at": now}
+            },
+            upsert=True
+        )
+    
+    async def record_history(self, user_id: str, recommendations: List[ProductRecommendation]):
+        """Add newly computed recommendations to the user's history (served by /history, never expired)."""
+        now = datetime.utcnow()
+        await self.db.recommendations.insert_one({
+            "user_id": user_id,
+            "products": [recommendation.model_dump() for recommendation in recommendations],
+            "catalog_version": self.catalog_version,
+            "created_at": now,
+            "updated_at": now
+        })
+    
+    async def generate_recommendations_batch(
+        self,
+        meta_prompts: Dict[str, str],
+        concurrency: int = 8
+    ) -> Dict[str, List[ProductRecommendation]]:
+        """
+        Generate recommendations for many users at once.
+        
+        Product retrieval for every meta-prompt runs as a single batched
+        similarity search; the per-user LLM calls then run with bounded
+        concurrency.
+        
+        Args:
+            meta_prompts: Mapping of user_id to meta-prompt text
+            concurrency: Maximum number of LLM calls in flight
+            
+        Returns:
+            Mapping of user_id to that user's recommendations, omitting users
+            whose recommendations could not be generated
+        """
+        if not meta_prompts:
+            return {}
+        
+        await self._sync_catalog()
+        user_ids = list(meta_prompts.keys())
+        relevant_products = self.vector_store.batch_similarity_search(
+            [meta_prompts[user_id] for user_id in user_ids], k=5
+        )
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def recommend(user_id: str, products: List[Dict[str, Any]]) -> Optional[List[ProductRecommendation]]:
+            async with semaphore:
+                try:
+                    return await self._generate_personalized_recommendations(
+                        meta_prompts[user_id], products, fallback=False
+                    )
+                except Exception as e:
+                    logger.error(f"Error generating recommendations for user {user_id}: {str(e)}")
+                    return None
+        
+        results = await asyncio.gather(
+            *(recommend(user_id, products) for user_id, products in zip(user_ids, relevant_products))
+        )
+        # Users whose LLM call failed are left out rather than given generic results
+        return {user_id: result for user_id, result in zip(user_ids, results) if result is not None}
+    
     async def _generate_personalized_recommendations(
         self, 
         meta_prompt: str, 
-        relevant_products: List[Dict[str, Any]]
+        relevant_products: List[Dict[str, Any]],
+        fallback: bool = True
     ) -> List[ProductRecommendation]:
         """
         Generate personalized recommendations with explanations using the LLM.
+        
+        If fallback is False, LLM errors are raised instead of being replaced
+        with generic recommendations, so callers can avoid caching them.
         """
         # Format product information for the LLM prompt
         products_text = ""
@@ -185,12 +396,13 @@ FORMAT YOUR RESPONSE AS:
         
         # Call the LLM
         try:
-            response = await openai.ChatCompletion.acreate(
-                model=settings.OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": "You are a financial advisor assistant that provides personalized product recommendations."},
-                    {"role": "user", "content": prompt}
-                ],
+            messages = [
+                {"role": "system", "content": "You are a financial advisor assistant that provides personalized product recommendations."},
+                {"role": "user", "content": prompt}
+            ]
+            response_text = await self.llm.complete(
+                messages,
+                route=choose_route(messages),
                 temperature=0.7,
                 max_tokens=1000,
                 top_p=0.95,
@@ -198,8 +410,6 @@ FORMAT YOUR RESPONSE AS:
                 presence_penalty=0
             )
             
-            response_text = response.choices[0].message.content.strip()
-            
             # Parse the response to extract the recommended products
             recommended_products = self._parse_recommendations(response_text, relevant_products)
             
@@ -224,7 +434,9 @@ FORMAT YOUR RESPONSE AS:
             return recommended_products[:3]
             
         except Exception as e:
-            logger.error(f"Error from OpenAI API: {str(e)}")
+            if not fallback:
+                raise
+            logger.error(f"Error from LLM provider: {str(e)}")
             return self._generate_generic_recommendations()
     
     def _parse_recommendations(
@@ -0,0 +1,53 @@
+from typing import Dict, Any, List
+
+import numpy as np
+import pandas as pd
+
+
+class UserIndexedFrame:
+    """
+    A DataFrame with a precomputed user_id -> row positions index.
+
+    The index is built once at load time with a single groupby pass, so each
+    per-user lookup is a dict access plus a positional slice of that user's
+    rows, instead of a boolean-mask scan over the whole table.
+
+    Keys are normalized to strings, so lookups work the same whether user IDs
+    were parsed from CSV as integers or passed in as strings.
+    """
+
+    def __init__(self, df: pd.DataFrame, key: str = "user_id"):
+        self.df = df
+        self.key = key
+
+        if df.empty or key not in df.columns:
+            self._positions: Dict[str, np.ndarray] = {}
+        else:
+            self._positions = {
+                str(user_id): positions
+                for user_id, positions in df.groupby(key, sort=False).indices.items()
+            }
+
+    @property
+    def empty(self) -> bool:
+        return self.df.empty
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def __contains__(self, user_id: Any) -> bool:
+        return str(user_id) in self._positions
+
+    def first(self, user_id: Any) -> Dict[str, Any]:
+        """Get the first row for a user as a dict, or an empty dict if the user has none."""
+        positions = self._positions.get(str(user_id))
+        if positions is None:
+            return {}
+        return self.df.iloc[positions[0]].to_dict()
+
+    def records(self, user_id: Any) -> List[Dict[str, Any]]:
+        """Get all rows for a user as a list of dicts."""
+        positions = self._positions.get(str(user_id))
+        if positions is None:
+            return []
+        return self.df.iloc[positions].to_dict('records')
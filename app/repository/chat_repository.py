@@ -2,10 +2,20 @@ from typing import List, Optional, Dict, Any
 from bson import ObjectId
 from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
 
+from app.config import settings
 from app.models.chat import ChatMessage, ChatMessageCreate, Conversation, ConversationCreate, ConversationUpdate, ConversationSummary
+from app.services.context_builder import select_recent
+from app.services.tracing import trace_methods
 
+# Bumped by every message insert or delete on a conversation whose
+# message_count hasn't been backfilled yet, so the backfill can tell whether
+# its count is still current when it writes it
+MESSAGE_WRITES_FIELD = "_message_writes"
 
+
+@trace_methods("chat_repository")
 class ChatRepository:
     """Repository for chat-related database operations."""
     
@@ -87,13 +97,17 @@ class ChatRepository:
         cursor = self.conversations_collection.find({"user_id": user_id}).sort("updated_at", -1).skip(skip).limit(limit)
         conversations = await cursor.to_list(length=limit)
         
+        # Message counts are denormalized onto each conversation; only conversations
+        # created before the counter existed need counting, done in one aggregation
+        legacy_ids = [str(conv["_id"]) for conv in conversations if "message_count" not in conv]
+        legacy_counts = await self._count_messages_by_conversation(legacy_ids) if legacy_ids else {}
+        
         result = []
         for conv in conversations:
-            # Get message count for each conversation
-            count = await self.messages_collection.count_documents({"conversation_id": str(conv["_id"])})
             conv_obj = Conversation(**conv)
+            count = conv["message_count"] if "message_count" in conv else legacy_counts.get(str(conv["_id"]), 0)
             result.append(ConversationSummary(
-                id=conv_obj.id,
+                id=str(conv_obj.id),
                 title=conv_obj.title,
                 created_at=conv_obj.created_at,
                 updated_at=conv_obj.updated_at,
@@ -102,6 +116,75 @@ class ChatRepository:
             
         return result
     
+    async def _count_messages_by_conversation(self, conversation_ids: List[str]) -> Dict[str, int]:
+        """Count messages for several conversations in a single round trip."""
+        pipeline = [
+            {"$match": {"conversation_id": {"$in": conversation_ids}}},
+            {"$group": {"_id": "$conversation_id", "count": {"$sum": 1}}}
+        ]
+        groups = await self.messages_collection.aggregate(pipeline).to_list(length=None)
+        return {group["_id"]: group["count"] for group in groups}
+    
+    async def backfill_message_counts(self, batch_size: int = 500, max_passes: int = 5) -> int:
+        """
+        Set message_count on conversations created before the counter existed.
+        
+        Legacy conversations are read in batches (ids and write markers only);
+        each batch is counted in one aggregation and written in one bulk_write.
+        A count is only written if no message was added to or deleted from
+        the conversation since it was read; conversations that changed are
+        recounted on the next pass, and any left after max_passes keep being
+        counted live by list_user_conversations.
+        
+        Args:
+            batch_size: Conversations counted and written per round trip
+            max_passes: Passes over conversations that changed while being counted
+            
+        Returns:
+            Number of conversations backfilled
+        """
+        backfilled = 0
+        for _ in range(max_passes):
+            cursor = self.conversations_collection.find(
+                {"message_count": {"$exists": False}},
+                {"_id": 1, MESSAGE_WRITES_FIELD: 1}
+            )
+            seen = 0
+            batch = []
+            async for conv in cursor:
+                batch.append(conv)
+                if len(batch) >= batch_size:
+                    seen += len(batch)
+                    backfilled += await self._backfill_batch(batch)
+                    batch = []
+            if batch:
+                seen += len(batch)
+                backfilled += await self._backfill_batch(batch)
+            if not seen:
+                break
+        return backfilled
+    
+    async def _backfill_batch(self, conversations: List[Dict[str, Any]]) -> int:
+        """Count and set message_count for conversations unchanged since they were read."""
+        counts = await self._count_messages_by_conversation([str(conv["_id"]) for conv in conversations])
+        operations = [
+            UpdateOne(
+                {
+                    "_id": conv["_id"],
+                    "message_count": {"$exists": False},
+                    # Missing (None) until the first message write
+                    MESSAGE_WRITES_FIELD: conv.get(MESSAGE_WRITES_FIELD)
+                },
+                {
+                    "$set": {"message_count": counts.get(str(conv["_id"]), 0)},
+                    "$unset": {MESSAGE_WRITES_FIELD: ""}
+                }
+            )
+            for conv in conversations
+        ]
+        result = await self.conversations_collection.bulk_write(operations, ordered=False)
+        return result.modified_count
+    
     # Message methods
     
     async def create_message(self, data: ChatMessageCreate) -> ChatMessage:
@@ -116,14 +199,23 @@ class ChatRepository:
             metadata=data.metadata or {}
         )
         
-        # Update conversation's updated_at timestamp
+        await self.messages_collection.insert_one(message.dict(by_alias=True))
+        
+        # Update conversation's updated_at timestamp and message counter
         if ObjectId.is_valid(data.conversation_id):
-            await self.conversations_collection.update_one(
-                {"_id": ObjectId(data.conversation_id)},
-                {"$set": {"updated_at": now}}
+            conversation_id = ObjectId(data.conversation_id)
+            result = await self.conversations_collection.update_one(
+                {"_id": conversation_id, "message_count": {"$exists": True}},
+                {"$set": {"updated_at": now}, "$inc": {"message_count": 1}}
             )
+            if result.matched_count == 0:
+                # Not backfilled yet: $inc would start the counter at 1, so leave
+                # it missing and let list_user_conversations count the messages
+                await self.conversations_collection.update_one(
+                    {"_id": conversation_id},
+                    {"$set": {"updated_at": now}, "$inc": {MESSAGE_WRITES_FIELD: 1}}
+                )
         
-        await self.messages_collection.insert_one(message.dict(by_alias=True))
         return message
     
     async def get_message(self, message_id: str) -> Optional[ChatMessage]:
@@ -151,23 +243,57 @@ class ChatRepository:
         if not ObjectId.is_valid(message_id):
             return False
             
+        message = await self.messages_collection.find_one({"_id": ObjectId(message_id)})
+        if not message:
+            return False
+        
         result = await self.messages_collection.delete_one({"_id": ObjectId(message_id)})
-        return result.deleted_count > 0
+        if result.deleted_count == 0:
+            return False
+        
+        # Keep the conversation's message counter in step
+        if ObjectId.is_valid(message["conversation_id"]):
+            conversation_id = ObjectId(message["conversation_id"])
+            result = await self.conversations_collection.update_one(
+                {"_id": conversation_id, "message_count": {"$exists": True}},
+                {"$inc": {"message_count": -1}}
+            )
+            if result.matched_count == 0:
+                # Not backfilled yet; invalidate any count the backfill is about to write
+                await self.conversations_collection.update_one(
+                    {"_id": conversation_id, "message_count": {"$exists": False}},
+                    {"$inc": {MESSAGE_WRITES_FIELD: 1}}
+                )
+        return True
     
-    async def get_conversation_context(self, conversation_id: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get the most recent messages from a conversation as context for AI."""
-        cursor = self.messages_collection.find({"conversation_id": conversation_id}).sort("created_at", -1).limit(limit)
+    async def get_conversation_context(
+        self,
+        conversation_id: str,
+        limit: Optional[int] = None,
+        max_tokens: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get the most recent messages from a conversation as context for AI.
+        
+        Up to `limit` messages are fetched (CONTEXT_MAX_HISTORY_MESSAGES by
+        default) and trimmed to the newest ones fitting `max_tokens`
+        (CONTEXT_MAX_PROMPT_TOKENS by default); the LLM call packs them
+        against the model's exact budget once the system prompt is known.
+        """
+        limit = limit or settings.CONTEXT_MAX_HISTORY_MESSAGES
+        cursor = self.messages_collection.find(
+            {"conversation_id": conversation_id},
+            {"_id": 0, "role": 1, "content": 1}
+        ).sort("created_at", -1).limit(limit)
         messages = await cursor.to_list(length=limit)
         
         # Reverse to get chronological order
         messages.reverse()
         
         # Convert to the format expected by AI
-        context = []
-        for msg in messages:
-            context.append({
-                "role": msg["role"].lower(),
-                "content": msg["content"]
-            })
-            
-        return context 
\ No newline at end of file
+        context = [
+            {"role": msg["role"].lower(), "content": msg["content"]}
+            for msg in messages
+        ]
+        
+        return select_recent(context, max_tokens or settings.CONTEXT_MAX_PROMPT_TOKENS)
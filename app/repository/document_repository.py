@@ -4,8 +4,10 @@ from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from app.models.document import Document, DocumentCreate, DocumentUpdate, DocumentSummary, DocumentAnalysis, ProcessingStatus
+from app.services.tracing import trace_methods
 
 
+@trace_methods("document_repository")
 class DocumentRepository:
     """Repository for document-related database operations."""
     
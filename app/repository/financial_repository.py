@@ -1,14 +1,45 @@
-from typing import List, Optional, Dict, Any
+import asyncio
+import hashlib
+import json
+import logging
+from typing import List, Optional, Dict, Any, Awaitable
 from bson import ObjectId
 from datetime import date, datetime
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
 
 from app.models.financial import (
     Product, ProductCreate, Investment, InvestmentCreate, InvestmentUpdate,
     Transaction, Account, CreditHistory, Demographic
 )
+from app.config import settings
+from app.services.context_cache import user_context_cache
+from app.services.tracing import trace_methods
 
+logger = logging.getLogger(__name__)
 
+# Natural key of each dataset, used to upsert rows during incremental sync
+NATURAL_KEYS = {
+    "products": "product_id",
+    "investments": "investment_id",
+    "transactions": "transaction_id",
+    "accounts": "user_id",
+    "credit_history": "user_id",
+    "demographics": "user_id",
+}
+
+# Field storing the content hash of the source row a document was synced from
+ROW_HASH_FIELD = "_row_hash"
+
+
+def row_hash(record: Dict[str, Any]) -> str:
+    """Stable content hash of a source row."""
+    payload = json.dumps(record, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+@trace_methods("financial_repository")
 class FinancialRepository:
     """Repository for financial data operations."""
     
@@ -48,6 +79,15 @@ class FinancialRepository:
         
         # Demographics indexes
         await self.demographics_collection.create_index("user_id", unique=True)
+        
+        # Natural keys used by incremental sync
+        for collection_name in ("products", "investments", "transactions"):
+            collection, key = self._sync_target(collection_name)
+            try:
+                await collection.create_index(key, unique=True)
+            except OperationFailure as e:
+                # Typically duplicates left by earlier full reloads
+                logger.warning(f"Could not create unique {key} index on {collection_name}: {str(e)}")
     
     # Product methods
     
@@ -109,6 +149,7 @@ class FinancialRepository:
         )
         
         await self.investments_collection.insert_one(investment.dict(by_alias=True))
+        user_context_cache.invalidate(data.user_id)
         return investment
     
     async def get_investment(self, investment_id: str) -> Optional[Investment]:
@@ -136,6 +177,7 @@ class FinancialRepository:
                 {"_id": ObjectId(investment_id)},
                 {"$set": update_data}
             )
+            user_context_cache.invalidate(investment.user_id)
             
         return await self.get_investment(investment_id)
     
@@ -152,9 +194,18 @@ class FinancialRepository:
     
     async def get_investment_summary(self, user_id: str) -> Dict[str, Any]:
         """Get investment summary for a user."""
-        investments = await self.get_user_investments(user_id)
+        # Aggregate per investment type in the database so only the totals come back
+        pipeline = [
+            {"$match": {"user_id": user_id}},
+            {"$group": {
+                "_id": "$investment_type",
+                "amount": {"$sum": "$amount"},
+                "current_value": {"$sum": "$current_value"}
+            }}
+        ]
+        groups = await self.investments_collection.aggregate(pipeline).to_list(length=None)
         
-        if not investments:
+        if not groups:
             return {
                 "total_invested": 0,
                 "total_current_value": 0,
@@ -163,25 +214,21 @@ class FinancialRepository:
                 "investment_types": {}
             }
         
-        total_invested = sum(inv.amount for inv in investments)
-        total_current = sum(inv.current_value for inv in investments)
-        
-        # Group by investment type
-        types = {}
-        for inv in investments:
-            inv_type = inv.investment_type.value
-            if inv_type not in types:
-                types[inv_type] = {"amount": 0, "current_value": 0}
-            
-            types[inv_type]["amount"] += inv.amount
-            types[inv_type]["current_value"] += inv.current_value
+        total_invested = sum(group["amount"] for group in groups)
+        total_current = sum(group["current_value"] for group in groups)
         
         # Calculate percentages for each type
-        for t in types:
-            types[t]["percentage"] = round((types[t]["amount"] / total_invested) * 100, 2)
-            gain_loss = types[t]["current_value"] - types[t]["amount"]
-            types[t]["gain_loss"] = gain_loss
-            types[t]["gain_loss_percentage"] = round((gain_loss / types[t]["amount"]) * 100, 2) if types[t]["amount"] > 0 else 0
+        types = {}
+        for group in groups:
+            amount = group["amount"]
+            gain_loss = group["current_value"] - amount
+            types[group["_id"]] = {
+                "amount": amount,
+                "current_value": group["current_value"],
+                "percentage": round((amount / total_invested) * 100, 2) if total_invested > 0 else 0,
+                "gain_loss": gain_loss,
+                "gain_loss_percentage": round((gain_loss / amount) * 100, 2) if amount > 0 else 0
+            }
         
         return {
             "total_invested": total_invested,
@@ -219,12 +266,33 @@ class FinancialRepository:
         """Get transaction summary for a user for the last X months."""
         from datetime import timedelta
         
-        end_date = datetime.utcnow().date()
-        start_date = end_date - timedelta(days=30 * months)
+        # Dates are stored as BSON datetimes, so match on datetimes rather than dates
+        end_date = datetime.utcnow()
+        start_date = datetime.combine(end_date.date() - timedelta(days=30 * months), datetime.min.time())
         
-        transactions = await self.get_user_transactions(user_id, start_date, end_date)
+        # Only count outgoing transactions (positive amounts)
+        match = {"$match": {
+            "user_id": user_id,
+            "date": {"$gte": start_date, "$lte": end_date},
+            "amount": {"$gt": 0}
+        }}
+        category_pipeline = [
+            match,
+            {"$group": {"_id": "$category", "amount": {"$sum": "$amount"}}}
+        ]
+        largest_pipeline = [
+            match,
+            {"$sort": {"amount": -1}},
+            {"$limit": 1},
+            {"$project": {"_id": 0, "amount": 1, "merchant": 1, "category": 1, "date": 1}}
+        ]
         
-        if not transactions:
+        category_groups, largest = await asyncio.gather(
+            self.transactions_collection.aggregate(category_pipeline).to_list(length=None),
+            self.transactions_collection.aggregate(largest_pipeline).to_list(length=1)
+        )
+        
+        if not category_groups:
             return {
                 "total_spending": 0,
                 "average_monthly": 0,
@@ -232,40 +300,27 @@ class FinancialRepository:
                 "largest_transaction": None
             }
         
-        # Calculate totals and find largest transaction
-        total_spending = 0
-        largest_tx = None
-        largest_amount = 0
-        categories = {}
-        
-        for tx in transactions:
-            if tx.amount > 0:  # Only count outgoing transactions (positive amounts)
-                total_spending += tx.amount
-                
-                if tx.category not in categories:
-                    categories[tx.category] = 0
-                categories[tx.category] += tx.amount
-                
-                if tx.amount > largest_amount:
-                    largest_amount = tx.amount
-                    largest_tx = tx
+        total_spending = sum(group["amount"] for group in category_groups)
         
         # Convert categories to percentages
-        for cat in categories:
-            categories[cat] = {
-                "amount": categories[cat],
-                "percentage": round((categories[cat] / total_spending) * 100, 2) if total_spending > 0 else 0
+        categories = {}
+        for group in category_groups:
+            categories[group["_id"]] = {
+                "amount": group["amount"],
+                "percentage": round((group["amount"] / total_spending) * 100, 2) if total_spending > 0 else 0
             }
         
+        largest_tx = largest[0] if largest else None
+        
         return {
             "total_spending": total_spending,
             "average_monthly": round(total_spending / months, 2),
             "categories": categories,
             "largest_transaction": {
-                "amount": largest_tx.amount,
-                "merchant": largest_tx.merchant,
-                "category": largest_tx.category,
-                "date": largest_tx.date.isoformat()
+                "amount": largest_tx["amount"],
+                "merchant": largest_tx.get("merchant"),
+                "category": largest_tx.get("category"),
+                "date": largest_tx["date"].isoformat() if hasattr(largest_tx.get("date"), "isoformat") else largest_tx.get("date")
             } if largest_tx else None
         }
     
@@ -296,14 +351,77 @@ class FinancialRepository:
             return Demographic(**result)
         return None
     
+    # Profile methods
+    
+    async def _get_profile_section(self, section: str, query: Awaitable[Any], timeout: float) -> Any:
+        """Run one profile query with its own timeout."""
+        try:
+            return await asyncio.wait_for(query, timeout=timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"{section} query timed out after {timeout}s")
+    
+    async def get_full_profile(self, user_id: str, timeouts: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """
+        Get all financial profile sections for a user concurrently.
+        
+        Each section runs with its own timeout, so total latency is bounded by
+        the slowest query rather than the sum of all of them. A failed or timed
+        out section is returned as None and reported under "errors" instead of
+        failing the whole profile.
+        
+        Args:
+            user_id: User ID
+            timeouts: Optional per-section timeouts in seconds
+            
+        Returns:
+            Dict with demographics, account, credit_history, investments and
+            transactions, plus an "errors" dict keyed by failed section
+        """
+        default_timeout = settings.FINANCIAL_PROFILE_SECTION_TIMEOUT_MS / 1000
+        timeouts = timeouts or {}
+        
+        queries = {
+            "demographics": self.get_user_demographics(user_id),
+            "account": self.get_user_account(user_id),
+            "credit_history": self.get_user_credit_history(user_id),
+            "investments": self.get_investment_summary(user_id),
+            "transactions": self.get_transaction_summary(user_id),
+        }
+        
+        results = await asyncio.gather(
+            *(
+                self._get_profile_section(section, query, timeouts.get(section, default_timeout))
+                for section, query in queries.items()
+            ),
+            return_exceptions=True
+        )
+        
+        profile: Dict[str, Any] = {"errors": {}}
+        for section, result in zip(queries, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Error getting {section} for user {user_id}: {str(result)}")
+                profile[section] = None
+                profile["errors"][section] = str(result)
+            else:
+                profile[section] = result
+        
+        return profile
+    
     # Data loading
     
+    def _invalidate_user_contexts(self, records: List[Dict[str, Any]]):
+        """Invalidate cached financial context for every user touched by a bulk load."""
+        user_context_cache.invalidate_many(
+            record["user_id"] for record in records if record.get("user_id") is not None
+        )
+    
     async def bulk_load_investments(self, investments: List[Dict[str, Any]]) -> int:
         """Bulk load investment data."""
         if not investments:
             return 0
             
-        result = await self.investments_collection.insert_many(investments)
+        result = await self.investments_collection.insert_many(investments, ordered=False)
+        self._invalidate_user_contexts(investments)
         return len(result.inserted_ids)
     
     async def bulk_load_transactions(self, transactions: List[Dict[str, Any]]) -> int:
@@ -311,7 +429,8 @@ class FinancialRepository:
         if not transactions:
             return 0
             
-        result = await self.transactions_collection.insert_many(transactions)
+        result = await self.transactions_collection.insert_many(transactions, ordered=False)
+        self._invalidate_user_contexts(transactions)
         return len(result.inserted_ids)
     
     async def bulk_load_accounts(self, accounts: List[Dict[str, Any]]) -> int:
@@ -319,7 +438,8 @@ class FinancialRepository:
         if not accounts:
             return 0
             
-        result = await self.accounts_collection.insert_many(accounts)
+        result = await self.accounts_collection.insert_many(accounts, ordered=False)
+        self._invalidate_user_contexts(accounts)
         return len(result.inserted_ids)
     
     async def bulk_load_credit_history(self, credit_history: List[Dict[str, Any]]) -> int:
@@ -327,7 +447,8 @@ class FinancialRepository:
         if not credit_history:
             return 0
             
-        result = await self.credit_history_collection.insert_many(credit_history)
+        result = await self.credit_history_collection.insert_many(credit_history, ordered=False)
+        self._invalidate_user_contexts(credit_history)
         return len(result.inserted_ids)
     
     async def bulk_load_demographics(self, demographics: List[Dict[str, Any]]) -> int:
@@ -335,7 +456,8 @@ class FinancialRepository:
         if not demographics:
             return 0
             
-        result = await self.demographics_collection.insert_many(demographics)
+        result = await self.demographics_collection.insert_many(demographics, ordered=False)
+        self._invalidate_user_contexts(demographics)
         return len(result.inserted_ids)
     
     async def bulk_load_products(self, products: List[Dict[str, Any]]) -> int:
@@ -343,5 +465,76 @@ class FinancialRepository:
         if not products:
             return 0
             
-        result = await self.products_collection.insert_many(products)
-        return len(result.inserted_ids) 
\ No newline at end of file
+        result = await self.products_collection.insert_many(products, ordered=False)
+        return len(result.inserted_ids)
+    
+    # Incremental sync
+    
+    def _sync_target(self, collection_name: str):
+        """Get the collection and natural key field for a synced dataset."""
+        collections = {
+            "products": self.products_collection,
+            "investments": self.investments_collection,
+            "transactions": self.transactions_collection,
+            "accounts": self.accounts_collection,
+            "credit_history": self.credit_history_collection,
+            "demographics": self.demographics_collection,
+        }
+        if collection_name not in collections:
+            raise ValueError(f"Unknown sync collection: {collection_name}")
+        return collections[collection_name], NATURAL_KEYS[collection_name]
+    
+    async def sync_records(self, collection_name: str, records: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Upsert records on their natural key, skipping rows that haven't changed.
+        
+        Each stored document carries a _row_hash of its source row. Existing
+        hashes for the batch are fetched in one query, and only new or changed
+        rows are sent in a single unordered bulk_write, so re-running a sync
+        over unchanged data writes nothing.
+        
+        Args:
+            collection_name: One of the keys of NATURAL_KEYS
+            records: Rows to sync
+            
+        Returns:
+            Counts of inserted, updated and unchanged rows
+        """
+        stats = {"inserted": 0, "updated": 0, "unchanged": 0}
+        if not records:
+            return stats
+        
+        collection, key = self._sync_target(collection_name)
+        
+        hashes = {}
+        for record in records:
+            record.pop("_id", None)
+            hashes[record[key]] = row_hash(record)
+        
+        existing = {}
+        cursor = collection.find({key: {"$in": list(hashes)}}, {key: 1, ROW_HASH_FIELD: 1, "_id": 0})
+        async for doc in cursor:
+            existing[doc[key]] = doc.get(ROW_HASH_FIELD)
+        
+        operations = []
+        changed = []
+        for record in records:
+            digest = hashes[record[key]]
+            if existing.get(record[key]) == digest:
+                stats["unchanged"] += 1
+                continue
+            operations.append(UpdateOne(
+                {key: record[key]},
+                {"$set": {**record, ROW_HASH_FIELD: digest}},
+                upsert=True
+            ))
+            changed.append(record)
+        
+        if operations:
+            result = await collection.bulk_write(operations, ordered=False)
+            stats["inserted"] = result.upserted_count
+            stats["updated"] = result.modified_count
+            if collection_name != "products":
+                self._invalidate_user_contexts(changed)
+        
+        return stats
@@ -8,6 +8,7 @@ from pymongo.errors import DuplicateKeyError
 
 from app.models.user import UserCreate, UserInDB, User, UserUpdate
 from app.database.mongodb import get_database
+from app.services.tracing import trace_methods
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -15,6 +16,7 @@ logger = logging.getLogger(__name__)
 # Password context for hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+@trace_methods("user_repository")
 class UserRepository:
     """Repository for user-related database operations."""
     
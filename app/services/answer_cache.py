@@ -0,0 +1,248 @@
+"""
+Semantic cache of answers to generic, profile-independent chat questions.
+
+Questions like "how do index funds work" get the same answer whoever asks.
+For those, the chat path skips the user's financial profile entirely: the
+latest message is embedded with the shared sentence-transformers model and
+matched against previously answered questions; above the similarity
+threshold the stored answer is returned without calling the LLM. On a miss
+the question is answered with a generic (profile-free) prompt and the answer
+is stored, so cached answers never contain another user's data.
+
+Only self-contained questions are cached: anything mentioning the user
+("my", "I", "we", ...), their accounts or activity ("balance", "spent",
+"transactions", ...), referring back to earlier turns ("it", "those",
+"what about ...") or containing numbers goes through the personalized path.
+"""
+import asyncio
+import logging
+import re
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.config import settings
+from app.models.embedding_index import get_embedding_model
+from app.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Mentions of the user or their own situation: the answer depends on the profile
+_PERSONAL_PATTERN = re.compile(
+    r"\b(i|i'm|im|i've|i'd|i'll|me|my|mine|myself|we|we're|our|ours|us)\b", re.IGNORECASE
+)
+# Account and activity vocabulary: "what is the balance" is about the user's own account
+_ACCOUNT_PATTERN = re.compile(
+    r"\b(balances?|transactions?|spent|spend|spending|purchases?|payments?|deposits?|withdrawals?|"
+    r"accounts?|statements?|bills?|charges?|transfers?|overdrafts?)\b",
+    re.IGNORECASE
+)
+# References to earlier turns: the question isn't self-contained
+_ANAPHORA_PATTERN = re.compile(r"\b(it|its|it's|they|them|those|these|this one|that one)\b", re.IGNORECASE)
+_FOLLOW_UP_PATTERN = re.compile(r"^\s*(and|but|also|so|then|what about|how about|why not)\b", re.IGNORECASE)
+_NON_WORD_PATTERN = re.compile(r"[^\w\s]")
+
+MIN_QUESTION_WORDS = 3
+MAX_QUESTION_WORDS = 40
+
+
+def is_profile_independent(question: str) -> bool:
+    """Whether a question can be answered (and the answer shared) without the user's profile or history."""
+    words = question.split()
+    if not MIN_QUESTION_WORDS <= len(words) <= MAX_QUESTION_WORDS:
+        return False
+    if any(ch.isdigit() for ch in question):
+        return False
+    return not (
+        _PERSONAL_PATTERN.search(question)
+        or _ACCOUNT_PATTERN.search(question)
+        or _ANAPHORA_PATTERN.search(question)
+        or _FOLLOW_UP_PATTERN.search(question)
+    )
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, punctuation-free, single-spaced form used for exact matches."""
+    return " ".join(_NON_WORD_PATTERN.sub(" ", question.lower()).split())
+
+
+class CachedAnswer:
+    """A stored answer and the question it was generated for."""
+
+    __slots__ = ("answer_id", "question", "answer", "expires_at", "hits")
+
+    def __init__(self, answer_id: str, question: str, answer: str, expires_at: float):
+        self.answer_id = answer_id
+        self.question = question
+        self.answer = answer
+        self.expires_at = expires_at
+        self.hits = 0
+
+
+class SemanticAnswerCache:
+    """
+    In-process TTL cache of answers, looked up by embedding similarity.
+
+    Embeddings are kept as one normalized float32 matrix so a lookup is a
+    single matrix-vector product; exact (normalized) repeats skip the
+    embedding model altogether.
+    """
+
+    def __init__(self, threshold: float, ttl_seconds: int, max_entries: int):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = ttl_seconds > 0 and max_entries > 0
+        self._entries: List[CachedAnswer] = []
+        self._embeddings: Optional[np.ndarray] = None
+        self._by_question: Dict[str, CachedAnswer] = {}
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+
+    async def _embed(self, question: str) -> Optional[np.ndarray]:
+        try:
+            # Model inference is CPU-bound; keep it off the event loop
+            embedding = await asyncio.to_thread(
+                lambda: get_embedding_model().encode([question], normalize_embeddings=True, convert_to_numpy=True)
+            )
+        except ImportError:
+            logger.warning("sentence-transformers is not installed; disabling the semantic answer cache")
+            self.enabled = False
+            return None
+        except Exception as e:
+            # A cache failure must never cost the caller its answer; the model
+            # load would also be retried (and fail) on every question
+            logger.error(f"Error embedding question; disabling the semantic answer cache: {str(e)}")
+            self.enabled = False
+            return None
+        return embedding[0].astype(np.float32)
+
+    def _expire(self):
+        now = time.monotonic()
+        if any(entry.expires_at <= now for entry in self._entries):
+            self._retain([i for i, entry in enumerate(self._entries) if entry.expires_at > now])
+
+    def _retain(self, keep: List[int]):
+        """Keep only the entries at the given positions (in order)."""
+        self._entries = [self._entries[i] for i in keep]
+        self._embeddings = self._embeddings[keep] if keep and self._embeddings is not None else None
+        self._by_question = {normalize_question(entry.question): entry for entry in self._entries}
+
+    def should_skip(self, question: Optional[str]) -> bool:
+        """Whether the cache doesn't apply to this question (disabled, or profile-dependent)."""
+        if not self.enabled or not question or not is_profile_independent(question):
+            self.skipped += 1
+            return True
+        return False
+
+    async def _match(self, question: str) -> Optional[CachedAnswer]:
+        """The fresh entry answering the same or a semantically equivalent question."""
+        self._expire()
+
+        entry = self._by_question.get(normalize_question(question))
+        if entry is None and self._entries:
+            # Snapshot: entries may be added or dropped while the question is embedded
+            entries, embeddings = list(self._entries), self._embeddings
+            embedding = await self._embed(question)
+            if embedding is not None and embeddings is not None:
+                # Normalized embeddings: the dot product is the cosine similarity
+                scores = embeddings @ embedding
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold and entries[best].expires_at > time.monotonic():
+                    entry = entries[best]
+        return entry
+
+    async def lookup(self, question: str) -> Optional[CachedAnswer]:
+        """Find a fresh answer to the same or a semantically equivalent question."""
+        entry = await self._match(question)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        entry.hits += 1
+        self.hits += 1
+        logger.debug(f"Answer cache hit {entry.answer_id} for question: {question[:80]}")
+        return entry
+
+    async def store(self, question: str, answer: str) -> Optional[CachedAnswer]:
+        """Cache the answer to a profile-independent question (empty answers are ignored)."""
+        if not self.enabled or not answer.strip():
+            return None
+
+        embedding = await self._embed(question)
+        if embedding is None:
+            return None
+
+        self._expire()
+        existing = self._by_question.get(normalize_question(question))
+        if existing is not None:
+            self.invalidate(existing.answer_id)
+
+        entry = CachedAnswer(uuid.uuid4().hex, question, answer, time.monotonic() + self.ttl_seconds)
+        self._entries.append(entry)
+        self._by_question[normalize_question(question)] = entry
+        self._embeddings = embedding[None, :] if self._embeddings is None else np.vstack([self._embeddings, embedding])
+
+        if len(self._entries) > self.max_entries:
+            # Evict the oldest entries
+            self._retain(list(range(len(self._entries) - self.max_entries, len(self._entries))))
+        return entry
+
+    def invalidate(self, answer_id: str) -> bool:
+        """Drop one cached answer (e.g. after it was reported as wrong or outdated)."""
+        keep = [i for i, entry in enumerate(self._entries) if entry.answer_id != answer_id]
+        if len(keep) == len(self._entries):
+            return False
+        self._retain(keep)
+        logger.info(f"Invalidated cached answer {answer_id}")
+        return True
+
+    async def invalidate_question(self, question: str) -> Optional[str]:
+        """Drop the answer that would be served for a question; returns its ID if there was one."""
+        entry = await self._match(question)
+        if entry is None:
+            return None
+        self.invalidate(entry.answer_id)
+        return entry.answer_id
+
+    def clear(self):
+        """Drop every cached answer (e.g. after product rates change)."""
+        self._entries = []
+        self._embeddings = None
+        self._by_question = {}
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "hit_rate": round(self.hits / total, 3) if total else 0,
+        }
+
+
+# Process-wide cache used by the chat path
+answer_cache = SemanticAnswerCache(
+    threshold=settings.ANSWER_CACHE_SIMILARITY_THRESHOLD,
+    ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+    max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+)
+
+
+def _collect_answer_cache_metrics():
+    """Expose semantic answer cache statistics on /api/metrics."""
+    stats = answer_cache.stats()
+    yield "answer_cache_entries", "Cached generic chat answers", "gauge", [({}, stats["entries"])]
+    yield "answer_cache_lookups_total", "Answer cache lookups by result", "counter", [
+        ({"result": "hit"}, stats["hits"]),
+        ({"result": "miss"}, stats["misses"]),
+        ({"result": "skipped"}, stats["skipped"]),
+    ]
+    yield "answer_cache_hit_rate", "Answer cache hits / (hits + misses)", "gauge", [({}, stats["hit_rate"])]
+
+
+registry.register_collector(_collect_answer_cache_metrics)
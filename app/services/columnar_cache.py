@@ -0,0 +1,216 @@
+"""
+Columnar (Arrow IPC) cache for the CSV datasets in data/.
+
+Build the cache once after the CSVs change:
+
+    python -m app.services.columnar_cache [--force]
+
+Loaders call read_dataset()/iter_dataset_batches() with the CSV path; they
+read the memory-mapped Arrow file when it is up to date with the CSV and fall
+back to parsing the CSV otherwise (or when pyarrow is not installed).
+
+Numeric and boolean columns without nulls are handed to pandas zero-copy, as
+read-only views of the mapped file: they cost page cache (shared by every
+process mapping the file) rather than private memory. String, date and
+nullable columns still have to be materialized as pandas objects; for those
+only the parse time is saved.
+"""
+import argparse
+import logging
+import os
+from pathlib import Path
+from typing import Iterator, List, Optional, Union
+
+import pandas as pd
+
+from app.config import settings
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+# Schema metadata keys recording which CSV version a cache file was built from
+_SOURCE_MTIME_KEY = b"source_mtime_ns"
+_SOURCE_SIZE_KEY = b"source_size"
+
+PathLike = Union[str, Path]
+
+
+def cache_path_for(csv_path: PathLike) -> Path:
+    """Location of the Arrow cache file for a CSV file."""
+    return Path(settings.DATA_CACHE_DIR) / (Path(csv_path).stem + ".arrow")
+
+
+def is_cache_fresh(csv_path: PathLike) -> bool:
+    """Whether an Arrow cache exists and was built from the current version of the CSV."""
+    if pa is None:
+        return False
+
+    cache_path = cache_path_for(csv_path)
+    if not cache_path.exists():
+        return False
+
+    try:
+        stat = os.stat(csv_path)
+        with pa.memory_map(str(cache_path), "r") as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return False
+
+    return (
+        metadata.get(_SOURCE_MTIME_KEY) == str(stat.st_mtime_ns).encode()
+        and metadata.get(_SOURCE_SIZE_KEY) == str(stat.st_size).encode()
+    )
+
+
+def _to_table(chunk: pd.DataFrame) -> "pa.Table":
+    """Convert a parsed CSV chunk to an Arrow table."""
+    try:
+        return pa.Table.from_pandas(chunk, preserve_index=False)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        # Object columns mixing numbers and strings: store their values as strings
+        chunk = chunk.copy()
+        for column in chunk.columns[chunk.dtypes == object]:
+            values = chunk[column]
+            chunk[column] = values.where(values.isna(), values.astype(str))
+        return pa.Table.from_pandas(chunk, preserve_index=False)
+
+
+def _unify_schemas(schemas: List["pa.Schema"]) -> "pa.Schema":
+    """
+    Column types for the whole file from the types inferred for each chunk.
+
+    Follows what pd.read_csv infers for the whole column: chunks with no
+    values don't constrain the type, integers mixed with floats (or with
+    missing values) become float64, a column with no values at all is
+    float64, and any other mix is stored as strings.
+    """
+    fields = []
+    for name in schemas[0].names:
+        types = {schema.field(name).type for schema in schemas} - {pa.null()}
+        if not types:
+            column_type = pa.float64()
+        elif len(types) == 1:
+            column_type = types.pop()
+        elif all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in types):
+            column_type = pa.float64()
+        else:
+            column_type = pa.string()
+        fields.append(pa.field(name, column_type))
+    return pa.schema(fields)
+
+
+def build_cache(csv_path: PathLike, chunksize: int = 1_000_000, force: bool = False) -> Optional[Path]:
+    """
+    Convert a CSV file to a typed Arrow IPC file.
+
+    The CSV is parsed in chunks with pandas, so memory use is bounded by the
+    chunk size. Types inferred per chunk can differ (a column empty in the
+    first chunk, integers that later gain missing values), so a first pass
+    settles each column's type over the whole file and a second pass writes
+    every chunk cast to it.
+
+    Returns:
+        The cache path, or None if the cache could not be built
+    """
+    if pa is None:
+        logger.warning("pyarrow is not installed; columnar dataset cache disabled")
+        return None
+
+    if not force and is_cache_fresh(csv_path):
+        logger.info(f"Columnar cache for {csv_path} is up to date")
+        return cache_path_for(csv_path)
+
+    cache_path = cache_path_for(csv_path)
+    os.makedirs(cache_path.parent, exist_ok=True)
+    stat = os.stat(csv_path)
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+
+    writer = None
+    rows = 0
+    try:
+        schemas = [_to_table(chunk).schema for chunk in pd.read_csv(csv_path, chunksize=chunksize)]
+        if not schemas:
+            logger.warning(f"{csv_path} is empty; no columnar cache built")
+            return None
+
+        schema = _unify_schemas(schemas).with_metadata({
+            _SOURCE_MTIME_KEY: str(stat.st_mtime_ns),
+            _SOURCE_SIZE_KEY: str(stat.st_size),
+        })
+        writer = pa.ipc.new_file(str(tmp_path), schema)
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            writer.write_table(_to_table(chunk).cast(schema))
+            rows += len(chunk)
+
+        writer.close()
+        writer = None
+        os.replace(tmp_path, cache_path)
+        logger.info(f"Built columnar cache {cache_path} with {rows} rows")
+        return cache_path
+
+    except Exception as e:
+        logger.error(f"Error building columnar cache for {csv_path}: {str(e)}")
+        return None
+
+    finally:
+        if writer is not None:
+            writer.close()
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def read_dataset(csv_path: PathLike) -> pd.DataFrame:
+    """
+    Read a dataset from its memory-mapped Arrow cache if fresh, otherwise from the CSV.
+    
+    Frames read from the cache may hold read-only columns (see the module
+    docstring), so they must not be modified in place.
+    """
+    if is_cache_fresh(csv_path):
+        with pa.memory_map(str(cache_path_for(csv_path)), "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+            # One block per column, so pandas doesn't consolidate (copy) the
+            # mapped buffers; converted buffers are released as it goes
+            return table.to_pandas(split_blocks=True, self_destruct=True)
+
+    return pd.read_csv(csv_path)
+
+
+def iter_dataset_batches(csv_path: PathLike, chunksize: int = 50_000) -> Iterator[pd.DataFrame]:
+    """Iterate over a dataset in chunks, from the Arrow cache if fresh, otherwise from the CSV."""
+    if is_cache_fresh(csv_path):
+        with pa.memory_map(str(cache_path_for(csv_path)), "r") as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                for offset in range(0, batch.num_rows, chunksize):
+                    yield batch.slice(offset, chunksize).to_pandas(split_blocks=True)
+        return
+
+    yield from pd.read_csv(csv_path, chunksize=chunksize)
+
+
+def build_all(force: bool = False):
+    """Build columnar caches for every dataset in settings.DATA_DIR."""
+    from app.services.dataset_registry import DATASET_FILES
+
+    data_dir = Path(settings.DATA_DIR)
+    for filename in DATASET_FILES:
+        csv_path = data_dir / filename
+        if csv_path.exists():
+            build_cache(csv_path, force=force)
+        else:
+            logger.warning(f"Dataset file not found at {csv_path}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Build the columnar cache for the CSV datasets")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the cache is up to date")
+    args = parser.parse_args()
+    build_all(force=args.force)
@@ -0,0 +1,160 @@
+"""
+Token-budgeted prompt assembly.
+
+Provider latency and cost scale with prompt tokens, so instead of sending a
+fixed number of past messages the chat paths pack the system prompt plus as
+many of the most recent turns as fit the model's prompt budget:
+
+    messages = pack_messages(system_prompt, history, model)
+
+Token counts use tiktoken when it is installed and otherwise a BPE-style
+estimate (words and punctuation, ~4 characters per token for long words),
+which tracks the OpenAI/Mistral tokenizers closely enough for budgeting.
+"""
+import json
+import logging
+import math
+import re
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # pragma: no cover - optional dependency (or offline, no BPE files)
+    _encoding = None
+
+logger = logging.getLogger(__name__)
+
+# Context window sizes (prompt + completion) for the models this app talks to
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "mistral-tiny": 32000,
+    "mistral-small": 32000,
+    "mistral-medium": 32000,
+    "mistral-large-latest": 128000,
+    "mistralai/Mistral-7B-Instruct-v0.1": 8192,
+    "stub-model": 8192,
+    "mock-model": 8192,
+}
+DEFAULT_CONTEXT_WINDOW = 4096
+
+# Per-message framing tokens added by the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_PIECE_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Number of tokens in a piece of text (exact with tiktoken, estimated otherwise)."""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return sum(math.ceil(len(piece) / 4) for piece in _PIECE_PATTERN.findall(text))
+
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    """Tokens a chat message contributes to the prompt, including framing."""
+    return estimate_tokens(str(message.get("content") or "")) + MESSAGE_OVERHEAD_TOKENS
+
+
+def prompt_budget(model: Optional[str] = None) -> int:
+    """
+    Prompt token budget for a model.
+
+    The model's context window minus the tokens reserved for the completion,
+    capped by CONTEXT_MAX_PROMPT_TOKENS to bound latency and cost.
+    """
+    window = MODEL_CONTEXT_WINDOWS.get(model or "", DEFAULT_CONTEXT_WINDOW)
+    return max(min(window - settings.CONTEXT_RESPONSE_RESERVE_TOKENS, settings.CONTEXT_MAX_PROMPT_TOKENS), 0)
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Keep the end of a text (the most recent part of a message) within max_tokens."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    if _encoding is not None:
+        return _encoding.decode(_encoding.encode(text, disallowed_special=())[-max_tokens:])
+    # ~4 characters per token; trim further until the estimate fits
+    keep = max_tokens * 4
+    while keep > 0 and estimate_tokens(text[-keep:]) > max_tokens:
+        keep = int(keep * 0.9)
+    return text[-keep:] if keep > 0 else ""
+
+
+def select_recent(history: List[Dict[str, Any]], max_tokens: int) -> List[Dict[str, Any]]:
+    """
+    The longest suffix of a conversation that fits in max_tokens.
+
+    The latest message is always kept (truncated if it alone exceeds the
+    budget), so the model sees what it is answering.
+
+    Args:
+        history: Messages in chronological order
+        max_tokens: Token budget for the selected messages
+
+    Returns:
+        Most recent messages, in chronological order
+    """
+    selected: List[Dict[str, Any]] = []
+    used = 0
+    for message in reversed(history):
+        cost = message_tokens(message)
+        if used + cost > max_tokens:
+            if not selected:
+                content = _truncate(str(message.get("content") or ""), max(max_tokens - MESSAGE_OVERHEAD_TOKENS, 1))
+                selected.append({**message, "content": content})
+            break
+        selected.append(message)
+        used += cost
+    selected.reverse()
+    return selected
+
+
+def pack_messages(
+    system_prompt: str,
+    history: List[Dict[str, Any]],
+    model: Optional[str] = None,
+    max_tokens: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Build the provider message list: system prompt plus the recent turns that fit.
+
+    Args:
+        system_prompt: System message content
+        history: Conversation messages ({"role", "content"}) in chronological order
+        model: Model the prompt is for, to pick its budget
+        max_tokens: Explicit prompt budget (defaults to prompt_budget(model))
+
+    Returns:
+        Messages for the chat completions API
+    """
+    budget = prompt_budget(model) if max_tokens is None else max_tokens
+    system_message = {"role": "system", "content": system_prompt}
+    remaining = budget - message_tokens(system_message)
+
+    recent = select_recent(history, max(remaining, 0))
+    if len(recent) < len(history):
+        logger.debug(f"Context budget {budget} tokens: kept {len(recent)} of {len(history)} messages")
+
+    return [system_message] + recent
+
+
+def _drop_empty(value: Any) -> Any:
+    if isinstance(value, dict):
+        compacted = {key: _drop_empty(item) for key, item in value.items()}
+        return {key: item for key, item in compacted.items() if item not in (None, "", [], {})}
+    if isinstance(value, list):
+        return [_drop_empty(item) for item in value]
+    return value
+
+
+def compact_json(data: Any) -> str:
+    """Serialize profile data for a prompt: no indentation or spacing, empty fields dropped."""
+    return json.dumps(_drop_empty(data), separators=(",", ":"), default=str)
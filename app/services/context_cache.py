@@ -0,0 +1,113 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Iterable
+
+from app.config import settings
+from app.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+
+class CachedUserContext:
+    """A user's financial context together with the system prompt rendered from it."""
+
+    __slots__ = ("context", "prompt", "expires_at")
+
+    def __init__(self, context: Dict[str, Any], prompt: Optional[str], expires_at: float):
+        self.context = context
+        self.prompt = prompt
+        self.expires_at = expires_at
+
+
+class UserContextCache:
+    """
+    TTL + LRU cache of per-user financial context.
+
+    Stores both the context dict and the rendered system prompt so repeated
+    chat turns skip the FinancialRepository queries and the JSON serialization.
+    Entries are invalidated explicitly whenever the underlying financial data
+    for a user is written.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedUserContext]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str) -> Optional[CachedUserContext]:
+        """Get the cached entry for a user, or None if missing or expired."""
+        user_id = str(user_id)
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry.expires_at <= time.monotonic():
+            del self._entries[user_id]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return entry
+
+    def set(self, user_id: str, context: Dict[str, Any], prompt: Optional[str] = None):
+        """Cache the context (and optionally the rendered prompt) for a user."""
+        if self.ttl_seconds <= 0:
+            return
+
+        user_id = str(user_id)
+        self._entries[user_id] = CachedUserContext(context, prompt, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(user_id)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str):
+        """Drop the cached entry for a user."""
+        if self._entries.pop(str(user_id), None) is not None:
+            logger.debug(f"Invalidated cached financial context for user {user_id}")
+
+    def invalidate_many(self, user_ids: Iterable[str]):
+        """Drop the cached entries for several users."""
+        for user_id in set(str(user_id) for user_id in user_ids):
+            self.invalidate(user_id)
+
+    def clear(self):
+        """Drop every cached entry."""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0,
+        }
+
+
+# Process-wide cache used by the chat path and invalidated by FinancialRepository
+user_context_cache = UserContextCache(
+    ttl_seconds=settings.USER_CONTEXT_CACHE_TTL_SECONDS,
+    max_entries=settings.USER_CONTEXT_CACHE_MAX_ENTRIES,
+)
+
+
+def invalidate_user_context(user_id: str):
+    """Invalidate the cached financial context for a user after their data changes."""
+    user_context_cache.invalidate(user_id)
+
+
+def _collect_cache_metrics():
+    """Expose user context cache statistics on /api/metrics."""
+    stats = user_context_cache.stats()
+    yield "user_context_cache_entries", "Cached user financial contexts", "gauge", [({}, stats["entries"])]
+    yield "user_context_cache_hits_total", "User context cache hits", "counter", [({}, stats["hits"])]
+    yield "user_context_cache_misses_total", "User context cache misses", "counter", [({}, stats["misses"])]
+
+
+registry.register_collector(_collect_cache_metrics)
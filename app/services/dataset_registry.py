@@ -0,0 +1,165 @@
+import gc
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Iterable, Set, Union
+
+import pandas as pd
+
+from app.config import settings
+from app.models.user_index import UserIndexedFrame
+from app.services.columnar_cache import read_dataset
+
+logger = logging.getLogger(__name__)
+
+# CSV datasets under settings.DATA_DIR used by the meta-prompt and recommendation models
+DATASET_FILES = (
+    "demographic_data.csv",
+    "account_data.csv",
+    "transaction_data.csv",
+    "credit_history.csv",
+    "investment_data.csv",
+    "social_media_sentiment.csv",
+    "products.csv",
+)
+
+
+class _DatasetEntry:
+    """A loaded dataset and the file version it was loaded from."""
+
+    __slots__ = ("frame", "mtime", "size", "checked_at", "user_index")
+
+    def __init__(self, frame: pd.DataFrame, mtime: float, size: int):
+        self.frame = frame
+        self.mtime = mtime
+        self.size = size
+        self.checked_at = time.monotonic()
+        self.user_index: Optional[UserIndexedFrame] = None
+
+
+class DatasetRegistry:
+    """
+    Process-wide registry of CSV datasets.
+
+    Each file is parsed once and the resulting DataFrame is shared by every
+    consumer (MetaPromptGenerator, RecommendationEngine, ...). Shared frames
+    must be treated as read-only; callers that need to modify one should copy
+    it first.
+
+    The file's mtime and size are re-checked at most every
+    settings.DATASET_RELOAD_CHECK_SECONDS. When the file has changed, the new
+    version is parsed (and indexed) in a background thread while readers keep
+    getting the old frame; it is then swapped in as a single assignment, so
+    readers see either the old frame or the new one, never a partial load.
+    Only a dataset's first load happens in the caller.
+    """
+
+    def __init__(self, check_interval: float = 5.0):
+        self.check_interval = check_interval
+        self._entries: Dict[str, _DatasetEntry] = {}
+        self._reloading: Set[str] = set()
+        self._lock = threading.RLock()
+
+    def get_frame(self, path: Union[str, Path]) -> Optional[pd.DataFrame]:
+        """Get the shared DataFrame for a CSV file, or None if the file doesn't exist."""
+        entry = self._get_entry(path)
+        return entry.frame if entry else None
+
+    def get_user_index(self, path: Union[str, Path]) -> UserIndexedFrame:
+        """Get the shared user_id index for a CSV file (empty if the file doesn't exist)."""
+        entry = self._get_entry(path)
+        if entry is None:
+            return UserIndexedFrame(pd.DataFrame())
+
+        if entry.user_index is None:
+            with self._lock:
+                if entry.user_index is None:
+                    entry.user_index = UserIndexedFrame(entry.frame)
+        return entry.user_index
+
+    def preload(self, paths: Iterable[Union[str, Path]]):
+        """Load and index datasets up front (e.g. before worker processes fork)."""
+        for path in paths:
+            if self.get_frame(path) is not None:
+                self.get_user_index(path)
+
+    def clear(self):
+        """Drop every loaded dataset."""
+        with self._lock:
+            self._entries.clear()
+
+    def _get_entry(self, path: Union[str, Path]) -> Optional[_DatasetEntry]:
+        key = os.path.abspath(path)
+        entry = self._entries.get(key)
+
+        if entry is not None and time.monotonic() - entry.checked_at < self.check_interval:
+            return entry
+
+        with self._lock:
+            entry = self._entries.get(key)
+            try:
+                stat = os.stat(key)
+            except FileNotFoundError:
+                self._entries.pop(key, None)
+                return None
+
+            if entry is not None and entry.mtime == stat.st_mtime and entry.size == stat.st_size:
+                entry.checked_at = time.monotonic()
+                return entry
+
+            if entry is None:
+                # Nothing to serve in the meantime: load in the caller
+                entry = _DatasetEntry(read_dataset(key), stat.st_mtime, stat.st_size)
+                self._entries[key] = entry
+                logger.info(f"Loaded dataset {key} with {len(entry.frame)} records")
+                return entry
+
+            # Keep serving the old version until the new one is ready
+            entry.checked_at = time.monotonic()
+            if key not in self._reloading:
+                self._reloading.add(key)
+                threading.Thread(
+                    target=self._reload,
+                    args=(key, entry.user_index is not None),
+                    name=f"dataset-reload-{os.path.basename(key)}",
+                    daemon=True,
+                ).start()
+            return entry
+
+    def _reload(self, key: str, build_index: bool):
+        """Parse a changed file off the request path and swap it in."""
+        try:
+            stat = os.stat(key)
+            new_entry = _DatasetEntry(read_dataset(key), stat.st_mtime, stat.st_size)
+            if build_index:
+                new_entry.user_index = UserIndexedFrame(new_entry.frame)
+            with self._lock:
+                self._entries[key] = new_entry
+            logger.info(f"Reloaded dataset {key} with {len(new_entry.frame)} records")
+        except Exception as e:
+            # The old version stays in place; the next check retries
+            logger.error(f"Error reloading dataset {key}: {str(e)}")
+        finally:
+            with self._lock:
+                self._reloading.discard(key)
+
+
+dataset_registry = DatasetRegistry(check_interval=settings.DATASET_RELOAD_CHECK_SECONDS)
+
+
+def preload_datasets():
+    """
+    Load every dataset into the shared registry and freeze the heap.
+
+    Call this before worker processes are forked (e.g. gunicorn --preload) so
+    the parsed frames live in pages shared copy-on-write by all workers.
+    gc.freeze() keeps the garbage collector from touching those objects and
+    dirtying the shared pages.
+    """
+    data_dir = Path(settings.DATA_DIR)
+    dataset_registry.preload(data_dir / name for name in DATASET_FILES)
+    dataset_registry.preload([settings.PRODUCTS_FILE])
+    gc.freeze()
+    logger.info("Preloaded shared datasets")
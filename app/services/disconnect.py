@@ -0,0 +1,59 @@
+"""
+Cancel request work when the HTTP client goes away.
+
+Starlette keeps running a non-streaming endpoint after the client
+disconnects, so a slow LLM completion would still hold a pooled provider
+connection (and a provider rate-limit slot) for a response nobody reads.
+cancel_on_disconnect() runs the work as a task and cancels it as soon as the
+client disconnects:
+
+    reply = await cancel_on_disconnect(request, generate_llm_response(context, user_id))
+
+Streaming responses don't need this: StreamingResponse already stops
+iterating (closing the generator) when the client disconnects.
+"""
+import asyncio
+import logging
+from typing import Awaitable, TypeVar
+
+from fastapi import Request
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Status recorded for requests abandoned by the client (nginx convention)
+CLIENT_CLOSED_REQUEST = 499
+
+
+class ClientDisconnected(Exception):
+    """The HTTP client disconnected before the response was ready."""
+
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[T], poll_interval: float = 0.25) -> T:
+    """
+    Await `awaitable`, cancelling it if the client disconnects first.
+
+    Args:
+        request: The incoming request (its body must already have been read)
+        awaitable: Work producing the response
+        poll_interval: Seconds between disconnect checks
+
+    Returns:
+        The awaitable's result
+
+    Raises:
+        ClientDisconnected: The client went away and the work was cancelled
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info(f"Client disconnected, cancelling {request.method} {request.url.path}")
+                raise ClientDisconnected(request.url.path)
+    finally:
+        if not task.done():
+            task.cancel()
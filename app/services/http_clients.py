@@ -0,0 +1,185 @@
+import logging
+import importlib.util
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional
+
+import httpx
+
+from app.config import settings
+from app.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Shared HTTP clients, one per LLM provider. Created on application startup
+# and closed on shutdown so connections (and TLS sessions) are reused across
+# chat turns instead of being re-established for every request.
+_clients: Dict[str, httpx.AsyncClient] = {}
+_pool_metrics: Dict[str, "PoolMetrics"] = {}
+
+PROVIDERS = ("openai", "mistral", "huggingface")
+
+
+class PoolMetrics:
+    """
+    In-flight request accounting for a single provider pool.
+
+    in_flight and utilization measure request concurrency against the
+    connection limit; with HTTP/2 several requests share a connection, so
+    they can exceed it without any queueing. saturated_requests is judged
+    from the pool's connections instead (see _pool_saturated).
+    """
+
+    def __init__(self, provider: str, max_connections: int):
+        self.provider = provider
+        self.max_connections = max_connections
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.total_requests = 0
+        # Requests that started while the pool had every allowed connection
+        # open and none could take another request, i.e. requests that had to
+        # queue for a free connection.
+        self.saturated_requests = 0
+        self.failed_requests = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "max_connections": self.max_connections,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "total_requests": self.total_requests,
+            "saturated_requests": self.saturated_requests,
+            "failed_requests": self.failed_requests,
+            "utilization": round(self.in_flight / self.max_connections, 3) if self.max_connections else 0,
+        }
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package (installed via httpx[http2])."""
+    return importlib.util.find_spec("h2") is not None
+
+
+def _max_connections(provider: str) -> int:
+    return getattr(settings, f"{provider.upper()}_POOL_MAX_CONNECTIONS", settings.LLM_POOL_MAX_CONNECTIONS)
+
+
+def _create_client(provider: str) -> httpx.AsyncClient:
+    """Create a pooled client for a provider using the configured limits."""
+    max_connections = _max_connections(provider)
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=min(settings.LLM_POOL_MAX_KEEPALIVE, max_connections),
+        keepalive_expiry=settings.LLM_POOL_KEEPALIVE_EXPIRY,
+    )
+
+    http2 = settings.LLM_HTTP2
+    if http2 and not _http2_available():
+        logger.warning("HTTP/2 requested for LLM clients but 'h2' is not installed; falling back to HTTP/1.1")
+        http2 = False
+
+    _pool_metrics[provider] = PoolMetrics(provider, max_connections)
+
+    if provider == "stub":
+        # Requests never leave the process; the stub emulates provider latency and errors
+        from app.services.llm_stub import create_stub_transport
+        return httpx.AsyncClient(timeout=60.0, transport=create_stub_transport())
+
+    logger.info(f"Created {provider} HTTP client pool (max_connections={max_connections}, http2={http2})")
+    return httpx.AsyncClient(timeout=60.0, limits=limits, http2=http2)
+
+
+async def init_http_clients():
+    """Create the shared provider clients. Called from the FastAPI startup hook."""
+    for provider in PROVIDERS:
+        if provider not in _clients:
+            _clients[provider] = _create_client(provider)
+
+
+async def close_http_clients():
+    """Close all shared provider clients. Called from the FastAPI shutdown hook."""
+    for provider, client in list(_clients.items()):
+        await client.aclose()
+        logger.info(f"Closed {provider} HTTP client pool")
+    _clients.clear()
+
+
+def get_http_client(provider: str) -> httpx.AsyncClient:
+    """
+    Get the shared client for a provider.
+
+    Clients are normally created on startup; scripts that use LLMService
+    outside the web app get one created lazily on first use.
+    """
+    client = _clients.get(provider)
+    if client is None or client.is_closed:
+        client = _create_client(provider)
+        _clients[provider] = client
+    return client
+
+
+def _pool_saturated(client: httpx.AsyncClient, max_connections: int) -> bool:
+    """
+    Whether a request started now would have to wait for a connection.
+
+    Judged from the client's connection pool: every allowed connection is open
+    and none is available (an HTTP/1.1 connection is busy, an HTTP/2 one has
+    no free stream). Clients without a connection pool, such as the stub, are
+    never saturated.
+    """
+    # httpx doesn't expose the pool publicly; httpcore's pool does expose its connections
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    if connections is None:
+        return False
+    return len(connections) >= max_connections and not any(connection.is_available() for connection in connections)
+
+
+@asynccontextmanager
+async def pooled_client(provider: str):
+    """
+    Yield the shared client for a provider while tracking pool saturation.
+
+    Usage:
+        async with pooled_client("openai") as client:
+            response = await client.post(...)
+    """
+    client = get_http_client(provider)
+    metrics = _pool_metrics[provider]
+
+    metrics.total_requests += 1
+    if _pool_saturated(client, metrics.max_connections):
+        metrics.saturated_requests += 1
+    metrics.in_flight += 1
+    metrics.peak_in_flight = max(metrics.peak_in_flight, metrics.in_flight)
+    try:
+        yield client
+    except Exception:
+        metrics.failed_requests += 1
+        raise
+    finally:
+        metrics.in_flight -= 1
+
+
+def get_pool_stats(provider: Optional[str] = None) -> Dict[str, Any]:
+    """Return pool saturation metrics for one provider or all of them."""
+    if provider:
+        metrics = _pool_metrics.get(provider)
+        return metrics.as_dict() if metrics else {}
+    return {name: metrics.as_dict() for name, metrics in _pool_metrics.items()}
+
+
+def _collect_pool_metrics():
+    """Expose pool saturation metrics on /api/metrics."""
+    stats = get_pool_stats()
+    families = (
+        ("llm_pool_in_flight", "gauge", "Requests currently using the provider pool (HTTP/2 requests share connections)", "in_flight"),
+        ("llm_pool_peak_in_flight", "gauge", "Highest number of concurrent requests seen", "peak_in_flight"),
+        ("llm_pool_max_connections", "gauge", "Configured connection limit", "max_connections"),
+        ("llm_pool_requests_total", "counter", "Requests made through the provider pool", "total_requests"),
+        ("llm_pool_saturated_requests_total", "counter", "Requests started while every allowed connection was open and busy", "saturated_requests"),
+        ("llm_pool_failed_requests_total", "counter", "Requests that raised an error", "failed_requests"),
+    )
+    for name, metric_type, help, key in families:
+        yield name, help, metric_type, [({"provider": provider}, values[key]) for provider, values in stats.items()]
+
+
+registry.register_collector(_collect_pool_metrics)
@@ -0,0 +1,233 @@
+"""
+Fast-path intent routing in front of the LLM.
+
+Most chat traffic is lookups: "what's my balance", "how much did I spend on
+groceries", "what's the mortgage rate". Those are answered directly from
+FinancialRepository data in a few milliseconds; only open-ended questions
+(advice, comparisons, planning) are sent to the provider.
+
+Classification is a cheap keyword/regex pass. It deliberately errs towards
+the LLM: anything asking for advice or longer than a short lookup question
+is left alone, as is a lookup whose data isn't available.
+"""
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from app.database import get_database
+from app.repository.financial_repository import FinancialRepository
+from app.services.metrics import registry
+from app.services.tracing import span
+
+logger = logging.getLogger(__name__)
+
+INTENT_BALANCE = "balance"
+INTENT_SPENDING = "spending_by_category"
+INTENT_PRODUCT_RATE = "product_rate"
+
+# Lookups are short; longer messages usually carry context the LLM should see
+MAX_LOOKUP_WORDS = 20
+
+# Requests for judgement rather than data
+_OPEN_ENDED_PATTERN = re.compile(
+    r"\b(should|recommend|advi[cs]e|suggest|compare|better|best|worth|why|plan|strategy|afford|help me|explain|improve|reduce)\b",
+    re.IGNORECASE,
+)
+_PERSONAL_PATTERN = re.compile(r"\b(i|i've|me|my|mine)\b", re.IGNORECASE)
+_BALANCE_PATTERN = re.compile(
+    r"\b(balances?|how much (money )?(do i have|have i got|is (there )?in))\b", re.IGNORECASE
+)
+_SPENDING_PATTERN = re.compile(r"\b(spend|spent|spending|expenses?|expenditures?)\b", re.IGNORECASE)
+_RATE_PATTERN = re.compile(r"\b(rates?|apy|apr|interest|yield|returns?)\b", re.IGNORECASE)
+_MONTHS_PATTERN = re.compile(r"\b(?:last|past)\s+(\d{1,2})\s+months?\b", re.IGNORECASE)
+
+# Words that say nothing about which product is meant
+_PRODUCT_STOPWORDS = {
+    "account", "accounts", "rate", "rates", "the", "what", "whats", "what's", "is", "are", "your",
+    "of", "on", "for", "a", "an", "current", "currently", "interest", "apy", "apr", "yield", "return",
+    "returns", "product", "products", "do", "you", "offer", "how", "much", "does", "pay", "pays", "today",
+}
+
+
+class Intent:
+    """A classified lookup and its parameters."""
+
+    __slots__ = ("name", "params")
+
+    def __init__(self, name: str, params: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.params = params or {}
+
+    def __repr__(self) -> str:
+        return f"Intent({self.name!r}, {self.params!r})"
+
+
+def classify(message: str) -> Optional[Intent]:
+    """
+    Classify a chat message as a data lookup, or None if it needs the LLM.
+
+    Args:
+        message: The user's latest message
+
+    Returns:
+        The lookup intent, or None for open-ended questions
+    """
+    if not message or len(message.split()) > MAX_LOOKUP_WORDS or _OPEN_ENDED_PATTERN.search(message):
+        return None
+
+    personal = bool(_PERSONAL_PATTERN.search(message))
+    lowered = message.lower()
+
+    if personal and _SPENDING_PATTERN.search(message):
+        months_match = _MONTHS_PATTERN.search(message)
+        if months_match:
+            months = int(months_match.group(1))
+        elif "last month" in lowered or "this month" in lowered:
+            months = 1
+        elif "this year" in lowered or "last year" in lowered:
+            months = 12
+        else:
+            months = 3
+        return Intent(INTENT_SPENDING, {"months": max(min(months, 24), 1)})
+
+    if personal and _BALANCE_PATTERN.search(message) and "transfer" not in lowered:
+        if "saving" in lowered:
+            account = "savings"
+        elif "checking" in lowered or "current account" in lowered:
+            account = "checking"
+        else:
+            account = "all"
+        return Intent(INTENT_BALANCE, {"account": account})
+
+    if _RATE_PATTERN.search(message) and not personal:
+        return Intent(INTENT_PRODUCT_RATE)
+
+    return None
+
+
+def _money(amount: float) -> str:
+    return f"${amount:,.2f}"
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+class IntentRouter:
+    """Answers lookup intents from FinancialRepository data."""
+
+    def __init__(self, financial_repo: FinancialRepository):
+        self.financial_repo = financial_repo
+
+    async def answer(self, intent: Intent, message: str, user_id: str) -> Optional[str]:
+        """
+        Answer a classified lookup.
+
+        Args:
+            intent: The message's intent, from classify()
+            message: The user's latest message
+            user_id: The user whose data is looked up
+
+        Returns:
+            The answer text, or None if the data isn't available
+        """
+        with span("intent_router.answer", intent=intent.name):
+            if intent.name == INTENT_PRODUCT_RATE:
+                return await self._answer_product_rate(message)
+            if intent.name == INTENT_BALANCE:
+                return await self._answer_balance(user_id, intent.params["account"])
+            if intent.name == INTENT_SPENDING:
+                return await self._answer_spending(message, user_id, intent.params["months"])
+        return None
+
+    async def _answer_balance(self, user_id: str, account_type: str) -> Optional[str]:
+        account = await self.financial_repo.get_user_account(user_id)
+        if account is None:
+            return None
+
+        if account_type == "checking":
+            return f"Your checking account balance is {_money(account.account_balance)}."
+        if account_type == "savings":
+            return f"Your savings account balance is {_money(account.savings_balance)}."
+        total = account.account_balance + account.savings_balance
+        return (
+            f"Your checking account balance is {_money(account.account_balance)} and your savings "
+            f"balance is {_money(account.savings_balance)}, for a total of {_money(total)}."
+        )
+
+    async def _answer_spending(self, message: str, user_id: str, months: int) -> Optional[str]:
+        summary = await self.financial_repo.get_transaction_summary(user_id, months=months)
+        period = "last month" if months == 1 else f"last {months} months"
+        categories: Dict[str, Dict[str, float]] = summary.get("categories") or {}
+        if not categories:
+            return f"I don't see any spending in the {period}."
+
+        # A category named in the question, matched on any of its words ("dining" -> "Food & Dining")
+        message_words = set(_words(message))
+        for category, values in categories.items():
+            if message_words & (set(_words(str(category))) - {"and"}):
+                return (
+                    f"You spent {_money(values['amount'])} on {category} in the {period} "
+                    f"({values['percentage']}% of your spending)."
+                )
+
+        top = sorted(categories.items(), key=lambda item: item[1]["amount"], reverse=True)[:5]
+        lines = [f"- {category}: {_money(values['amount'])} ({values['percentage']}%)" for category, values in top]
+        return (
+            f"You spent {_money(summary['total_spending'])} in the {period} "
+            f"(about {_money(summary['average_monthly'])} a month). Top categories:\n" + "\n".join(lines)
+        )
+
+    async def _answer_product_rate(self, message: str) -> Optional[str]:
+        products = await self.financial_repo.list_products(limit=100)
+        if not products:
+            return None
+
+        # Products sharing a distinctive word with the question, best overlap first
+        message_words = set(_words(message)) - _PRODUCT_STOPWORDS
+        scored = []
+        for product in products:
+            product_words = set(_words(f"{product.name} {product.category}")) - _PRODUCT_STOPWORDS
+            overlap = len(message_words & product_words)
+            if overlap:
+                scored.append((overlap, product))
+        if not scored:
+            return None
+
+        best = max(overlap for overlap, _ in scored)
+        matches = [product for overlap, product in scored if overlap == best][:5]
+        lines = []
+        for product in matches:
+            term = f", {product.term_years}-year term" if product.term_years else ""
+            lines.append(f"- {product.name} ({product.category}): {product.interest_rate:g}%{term}")
+        return "Current rates:\n" + "\n".join(lines)
+
+
+_routed = registry.counter(
+    "chat_intent_routed_total",
+    "Chat messages by handling path (intent answered directly, or sent to the LLM)",
+    ["intent"],
+)
+
+
+async def route_message(message: Optional[str], user_id: str) -> Optional[str]:
+    """
+    Answer a chat message from financial data when it is a simple lookup.
+
+    Returns None (and the caller should use the LLM) for open-ended questions,
+    when no database is available, or when the data needed isn't there.
+    """
+    intent = classify(message) if message else None
+    db = get_database() if intent is not None else None
+    if intent is None or db is None:
+        _routed.inc(intent="llm")
+        return None
+
+    try:
+        answer = await IntentRouter(FinancialRepository(db)).answer(intent, message, user_id)
+    except Exception as e:
+        logger.error(f"Error answering {intent.name} intent: {str(e)}")
+        answer = None
+
+    _routed.inc(intent=intent.name if answer is not None else "llm")
+    return answer
@@ -0,0 +1,215 @@
+"""
+In-process OpenAI/Mistral-compatible LLM stub for capacity testing.
+
+StubLLMTransport is an httpx transport that answers chat completion requests
+(streaming and non-streaming) locally, with configurable provider behavior:
+
+- time to first token and tokens/sec, so latency scales with response length
+- a random error rate (HTTP 500)
+- periodic 429 bursts: for LLM_STUB_RATE_LIMIT_BURST_SECONDS out of every
+  LLM_STUB_RATE_LIMIT_PERIOD_SECONDS every request is rate limited
+- a cap on concurrently served requests, so queueing behaves like a
+  provider-side connection limit
+
+Select it with LLM_PROVIDER=stub; the shared "stub" client in http_clients
+is created with this transport, so the rest of LLMService runs unchanged.
+"""
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Most recently created stub transport, for reporting its counters
+_transport: Optional["StubLLMTransport"] = None
+
+_STUB_TEXT = (
+    "Based on your financial profile, building an emergency fund that covers three to six months "
+    "of expenses is a sensible first step. After that, consider contributing regularly to a "
+    "diversified, low-cost index fund, and review your spending categories each month to find "
+    "room for additional savings. "
+)
+
+
+class StubLLMTransport(httpx.AsyncBaseTransport):
+    """httpx transport emulating an OpenAI-compatible chat completions endpoint."""
+
+    def __init__(
+        self,
+        ttft_ms: float = 300.0,
+        tokens_per_second: float = 50.0,
+        response_tokens: int = 120,
+        error_rate: float = 0.0,
+        rate_limit_period_seconds: float = 0.0,
+        rate_limit_burst_seconds: float = 0.0,
+        max_concurrency: int = 0,
+        seed: Optional[int] = None,
+    ):
+        self.ttft = ttft_ms / 1000
+        self.token_interval = 1 / tokens_per_second if tokens_per_second > 0 else 0
+        self.response_tokens = response_tokens
+        self.error_rate = error_rate
+        self.rate_limit_period = rate_limit_period_seconds
+        self.rate_limit_burst = rate_limit_burst_seconds
+        self._semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        self._random = random.Random(seed)
+        self._started = time.monotonic()
+        self._tokens = _STUB_TEXT.split(" ")
+
+        self.stats = {"requests": 0, "completed": 0, "rate_limited": 0, "errors": 0, "in_flight": 0}
+
+    def _rate_limited(self) -> bool:
+        if self.rate_limit_period <= 0 or self.rate_limit_burst <= 0:
+            return False
+        return (time.monotonic() - self._started) % self.rate_limit_period < self.rate_limit_burst
+
+    def _completion_tokens(self, payload: Dict[str, Any]) -> List[str]:
+        count = min(self.response_tokens, payload.get("max_tokens") or self.response_tokens)
+        return [
+            (" " if i else "") + self._tokens[i % len(self._tokens)]
+            for i in range(count)
+        ]
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats["requests"] += 1
+        payload = json.loads(await request.aread() or b"{}")
+
+        if self._rate_limited():
+            self.stats["rate_limited"] += 1
+            return httpx.Response(
+                429,
+                headers={"Retry-After": str(max(int(self.rate_limit_burst), 1))},
+                json={"error": {"message": "Rate limit reached (stub)", "type": "rate_limit_exceeded"}},
+                request=request,
+            )
+
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.stats["errors"] += 1
+            return httpx.Response(
+                500,
+                json={"error": {"message": "Internal server error (stub)", "type": "server_error"}},
+                request=request,
+            )
+
+        tokens = self._completion_tokens(payload)
+        model = payload.get("model", "stub-model")
+
+        if payload.get("stream"):
+            return httpx.Response(
+                200,
+                headers={"Content-Type": "text/event-stream"},
+                stream=_StubEventStream(self, model, tokens),
+                request=request,
+            )
+
+        await self._acquire()
+        try:
+            await asyncio.sleep(self.ttft + self.token_interval * max(len(tokens) - 1, 0))
+        finally:
+            self._release()
+        self.stats["completed"] += 1
+
+        return httpx.Response(
+            200,
+            json={
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens)},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": _estimate_prompt_tokens(payload),
+                    "completion_tokens": len(tokens),
+                    "total_tokens": _estimate_prompt_tokens(payload) + len(tokens),
+                },
+            },
+            request=request,
+        )
+
+    async def _acquire(self):
+        if self._semaphore is not None:
+            await self._semaphore.acquire()
+        self.stats["in_flight"] += 1
+
+    def _release(self):
+        self.stats["in_flight"] -= 1
+        if self._semaphore is not None:
+            self._semaphore.release()
+
+
+class _StubEventStream(httpx.AsyncByteStream):
+    """Server-sent events body emitting one chat.completion.chunk per token."""
+
+    def __init__(self, transport: StubLLMTransport, model: str, tokens: List[str]):
+        self.transport = transport
+        self.model = model
+        self.tokens = tokens
+        self.completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+    def _event(self, delta: Dict[str, Any], finish_reason: Optional[str] = None) -> bytes:
+        chunk = {
+            "id": self.completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": self.model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(chunk)}\n\n".encode()
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        transport = self.transport
+        await transport._acquire()
+        try:
+            await asyncio.sleep(transport.ttft)
+            yield self._event({"role": "assistant", "content": ""})
+            for i, token in enumerate(self.tokens):
+                if i:
+                    await asyncio.sleep(transport.token_interval)
+                yield self._event({"content": token})
+            yield self._event({}, finish_reason="stop")
+            yield b"data: [DONE]\n\n"
+            transport.stats["completed"] += 1
+        finally:
+            transport._release()
+
+
+def _estimate_prompt_tokens(payload: Dict[str, Any]) -> int:
+    """Rough prompt size in tokens (~4 characters per token)."""
+    characters = sum(len(str(message.get("content", ""))) for message in payload.get("messages", []))
+    return characters // 4
+
+
+def create_stub_transport() -> StubLLMTransport:
+    """Create the stub transport from the LLM_STUB_* settings."""
+    global _transport
+    transport = _transport = StubLLMTransport(
+        ttft_ms=settings.LLM_STUB_TTFT_MS,
+        tokens_per_second=settings.LLM_STUB_TOKENS_PER_SECOND,
+        response_tokens=settings.LLM_STUB_RESPONSE_TOKENS,
+        error_rate=settings.LLM_STUB_ERROR_RATE,
+        rate_limit_period_seconds=settings.LLM_STUB_RATE_LIMIT_PERIOD_SECONDS,
+        rate_limit_burst_seconds=settings.LLM_STUB_RATE_LIMIT_BURST_SECONDS,
+        max_concurrency=settings.LLM_STUB_MAX_CONCURRENCY,
+    )
+    logger.info(
+        f"Using stub LLM transport (ttft={settings.LLM_STUB_TTFT_MS}ms, "
+        f"tokens/sec={settings.LLM_STUB_TOKENS_PER_SECOND}, error_rate={settings.LLM_STUB_ERROR_RATE})"
+    )
+    return transport
+
+
+def get_stub_stats() -> Dict[str, Any]:
+    """Request counters of the stub transport (empty if the stub provider isn't in use)."""
+    return dict(_transport.stats) if _transport else {}
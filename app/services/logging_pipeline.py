@@ -0,0 +1,159 @@
+"""
+Non-blocking application logging.
+
+setup_logging() routes every log record through a QueueHandler on the root
+logger. Records are formatted and written by a QueueListener thread, so the
+event loop only pays for creating the record and enqueueing it. With
+LOG_FORMAT=json each line is a JSON object carrying the current trace and span
+IDs, so logs can be joined with exported traces.
+
+Large payloads such as LLM prompts go through log_prompt(), which skips them
+entirely unless DEBUG logging is on or the request is picked by
+LOG_PROMPT_SAMPLE_RATE, and defers building the text to the listener thread.
+"""
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.services.tracing import current_span
+
+_TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Attributes every LogRecord has; anything else was passed via `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+
+
+class _TraceContextFilter(logging.Filter):
+    """Attach the active trace/span IDs while still on the logging thread."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        active = current_span()
+        record.trace_id = active.trace_id if active else None
+        record.span_id = active.span_id if active else None
+        return True
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread.
+
+    The stock prepare() formats the message on the calling thread (to make the
+    record picklable for multiprocessing queues); this queue is in-process,
+    so the record is passed through unchanged.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message, trace context and extras."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "trace_id", None):
+            entry["trace_id"] = record.trace_id
+            entry["span_id"] = record.span_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in ("trace_id", "span_id"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def setup_logging(level: Optional[int] = None):
+    """
+    Install the queue-based logging pipeline on the root logger.
+
+    Replaces any handlers installed earlier (e.g. by logging.basicConfig calls
+    in imported modules). Safe to call more than once.
+    """
+    global _listener
+
+    if level is None:
+        level = logging.DEBUG if settings.DEBUG else getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO)
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else logging.Formatter(_TEXT_FORMAT))
+
+    if _listener is not None:
+        _listener.stop()
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    handler = _DeferredQueueHandler(log_queue)
+    handler.addFilter(_TraceContextFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+        existing.close()
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the background writer."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class _PromptText:
+    """Prompt messages rendered to text only when the record is formatted."""
+
+    __slots__ = ("messages", "max_chars")
+
+    def __init__(self, messages: List[Dict[str, Any]], max_chars: int):
+        # Snapshot (role, content) pairs; the strings themselves are immutable
+        self.messages = [(str(m.get("role", "")), m.get("content", "")) for m in messages if isinstance(m, dict)]
+        self.max_chars = max_chars
+
+    def __str__(self) -> str:
+        text = "\n".join(f"{role.upper()}: {content}" for role, content in self.messages)
+        if self.max_chars and len(text) > self.max_chars:
+            text = f"{text[:self.max_chars]}... [{len(text) - self.max_chars} more chars]"
+        return text
+
+
+def log_prompt(logger: logging.Logger, messages: List[Dict[str, Any]], label: str = "LLM prompt"):
+    """
+    Log a prompt body at debug level, or for a sample of requests at info level.
+
+    Nothing is built unless the prompt is actually logged, and even then the
+    text is assembled by the listener thread rather than the event loop.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        level = logging.DEBUG
+    elif settings.LOG_PROMPT_SAMPLE_RATE > 0 and random.random() < settings.LOG_PROMPT_SAMPLE_RATE:
+        level = logging.INFO
+    else:
+        return
+
+    logger.log(
+        level,
+        "%s (%d messages):\n%s",
+        label,
+        len(messages),
+        _PromptText(messages, settings.LOG_PROMPT_MAX_CHARS),
+        extra={"prompt_messages": len(messages)},
+    )
@@ -0,0 +1,167 @@
+"""
+Complexity-based routing of LLM calls to a fast or a strong model.
+
+Most chat turns are short and simple and are answered well by the cheapest,
+fastest model. Long or analytical turns (portfolio and investment analysis,
+comparisons, multi-step planning) go to a stronger model:
+
+    route = choose_route(messages)                  # "fast" or "strong"
+    reply = await llm.complete(messages, route=route)
+
+Each route maps to a "provider:model" target (MODEL_ROUTE_FAST,
+MODEL_ROUTE_STRONG). LLMService falls back to its default provider and model
+when a route's provider has no API key. Every routed call records its
+latency and estimated token usage and cost, labelled by route.
+"""
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.services.context_builder import MESSAGE_OVERHEAD_TOKENS, estimate_tokens
+from app.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+ROUTE_FAST = "fast"
+ROUTE_STRONG = "strong"
+# Calls made without a route (image analysis, explicit model overrides)
+ROUTE_DEFAULT = "default"
+
+# Estimated list prices in USD per 1K (prompt, completion) tokens; unlisted models count as free
+MODEL_PRICES_PER_1K = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "mistral-tiny": (0.00025, 0.00025),
+    "mistral-small": (0.002, 0.006),
+    "mistral-small-latest": (0.0002, 0.0006),
+    "mistral-medium": (0.0027, 0.0081),
+    "mistral-large-latest": (0.002, 0.006),
+}
+
+
+class RouteTarget:
+    """Provider and model a route sends its calls to."""
+
+    __slots__ = ("provider", "model")
+
+    def __init__(self, provider: str, model: str):
+        self.provider = provider
+        self.model = model
+
+    def __repr__(self) -> str:
+        return f"RouteTarget({self.provider!r}, {self.model!r})"
+
+
+def parse_target(value: Optional[str]) -> Optional[RouteTarget]:
+    """Parse a "provider:model" setting; None if it is empty or malformed."""
+    provider, _, model = (value or "").partition(":")
+    if not provider.strip() or not model.strip():
+        if value:
+            logger.warning(f"Ignoring model route target {value!r}; expected 'provider:model'")
+        return None
+    return RouteTarget(provider.strip().lower(), model.strip())
+
+
+ROUTE_TARGETS: Dict[str, Optional[RouteTarget]] = {
+    ROUTE_FAST: parse_target(settings.MODEL_ROUTE_FAST),
+    ROUTE_STRONG: parse_target(settings.MODEL_ROUTE_STRONG),
+}
+
+# Prefix match, so "analy" covers analyse/analysis/analytical
+_STRONG_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(keyword.lower()) for keyword in settings.MODEL_ROUTE_STRONG_KEYWORDS if keyword) + r")",
+    re.IGNORECASE,
+) if any(settings.MODEL_ROUTE_STRONG_KEYWORDS) else None
+
+
+def _text(content: Any) -> str:
+    """Text of a message's content, skipping non-text parts such as images."""
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return str(content or "")
+
+
+def choose_route(messages: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    Pick the route for a conversation from its latest user turn.
+
+    Args:
+        messages: Conversation turns, oldest first (a system prompt is ignored)
+
+    Returns:
+        ROUTE_STRONG for long or analytical turns, ROUTE_FAST otherwise,
+        or None when routing is disabled
+    """
+    if not settings.MODEL_ROUTING_ENABLED:
+        return None
+
+    latest = next((m for m in reversed(messages or []) if isinstance(m, dict) and m.get("role") == "user"), None)
+    text = _text(latest.get("content")) if latest else ""
+    if estimate_tokens(text) >= settings.MODEL_ROUTE_STRONG_MIN_TOKENS:
+        return ROUTE_STRONG
+    if _STRONG_PATTERN is not None and _STRONG_PATTERN.search(text):
+        return ROUTE_STRONG
+    return ROUTE_FAST
+
+
+_latency = registry.histogram(
+    "llm_route_latency_seconds",
+    "LLM completion latency by model route",
+    ["route", "provider", "model", "outcome"],
+)
+_tokens = registry.counter(
+    "llm_route_tokens_total",
+    "Estimated LLM tokens by model route and direction",
+    ["route", "model", "direction"],
+)
+_cost = registry.counter(
+    "llm_route_cost_usd_total",
+    "Estimated LLM spend in USD by model route",
+    ["route", "provider", "model"],
+)
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimated USD cost of a call at MODEL_PRICES_PER_1K list prices."""
+    prompt_price, completion_price = MODEL_PRICES_PER_1K.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+
+def record_call(
+    route: Optional[str],
+    provider: str,
+    model: str,
+    seconds: float,
+    messages: List[Dict[str, Any]],
+    completion: Optional[str] = None,
+    outcome: Optional[str] = None
+):
+    """
+    Record one provider call's latency and, if text was generated, its estimated tokens and cost.
+
+    Args:
+        route: The call's route (None for unrouted calls)
+        provider: Provider that served the call
+        model: Model that served the call
+        seconds: Wall-clock duration of the call
+        messages: Prompt messages sent
+        completion: Generated text (possibly partial), or None if there is none
+        outcome: "ok", "error" or "cancelled"; defaults to "ok" with a completion, "error" without
+    """
+    route = route or ROUTE_DEFAULT
+    if outcome is None:
+        outcome = "ok" if completion is not None else "error"
+    _latency.observe(seconds, route=route, provider=provider, model=model, outcome=outcome)
+    if completion is None:
+        return
+
+    prompt_tokens = sum(estimate_tokens(_text(m.get("content"))) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+    completion_tokens = estimate_tokens(completion)
+    _tokens.inc(prompt_tokens, route=route, model=model, direction="prompt")
+    _tokens.inc(completion_tokens, route=route, model=model, direction="completion")
+    _cost.inc(estimate_cost(model, prompt_tokens, completion_tokens), route=route, provider=provider, model=model)
+
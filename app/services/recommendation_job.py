@@ -0,0 +1,85 @@
+import logging
+import asyncio
+import time
+from typing import Dict, Any, Optional
+
+from app.database.mongodb import connect_to_mongo, close_mongo_connection
+from app.models.recommendation_engine import RecommendationEngine
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+async def precompute_recommendations(
+    db,
+    chunk_size: int = 1024,
+    concurrency: int = 8,
+    limit: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Precompute product recommendations for every user with a meta-prompt.
+
+    Meta-prompts are read in chunks; each chunk gets one batched similarity
+    search and bounded-concurrency LLM calls, and its results are written to
+    the recommendations cache before the next chunk is read.
+
+    Args:
+        db: Database instance
+        chunk_size: Number of users retrieved and searched per batch
+        concurrency: Maximum number of LLM calls in flight
+        limit: Optional cap on the number of users processed
+
+    Returns:
+        Run statistics
+    """
+    engine = RecommendationEngine(db)
+    started = time.monotonic()
+    processed = 0
+
+    async def flush(chunk: Dict[str, str]):
+        results = await engine.generate_recommendations_batch(chunk, concurrency=concurrency)
+        # Write straight into the recommendations cache so dashboard loads hit it
+        for user_id, products in results.items():
+            await engine.store_cached_recommendations(user_id, chunk[user_id], products, source="nightly")
+
+    chunk: Dict[str, str] = {}
+    cursor = db.meta_prompts.find({}, {"user_id": 1, "prompt_text": 1})
+    async for doc in cursor:
+        chunk[doc["user_id"]] = doc["prompt_text"]
+        if len(chunk) >= chunk_size:
+            await flush(chunk)
+            processed += len(chunk)
+            logger.info(f"Precomputed recommendations for {processed} users")
+            chunk = {}
+        if limit and processed + len(chunk) >= limit:
+            break
+
+    if chunk:
+        await flush(chunk)
+        processed += len(chunk)
+
+    elapsed = time.monotonic() - started
+    stats = {
+        "users": processed,
+        "seconds": round(elapsed, 2),
+        "users_per_second": round(processed / elapsed, 2) if elapsed > 0 else 0,
+    }
+    logger.info(f"Recommendation precompute finished: {stats}")
+    return stats
+
+
+async def run_nightly_job():
+    """Entry point for the nightly recommendation precompute."""
+    db = await connect_to_mongo()
+    try:
+        await precompute_recommendations(db)
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_nightly_job())
@@ -0,0 +1,107 @@
+"""
+Single-flight coalescing of identical concurrent async calls.
+
+When several callers ask for the same thing at the same time (dashboard
+refreshes, a message resent from several tabs), only the first starts the
+work; the others await the same task and get the same result or exception:
+
+    reply = await llm_single_flight.do(key, lambda: call_provider(payload))
+
+Nothing is cached: once the shared call finishes, the next request with the
+same key starts a new one. The shared task is shielded from any single
+waiter's cancellation and is only cancelled when every waiter has gone.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+from app.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Call:
+    """An in-flight shared call and the number of callers awaiting it."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Future[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time, sharing its outcome with concurrent callers."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, _Call] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await the in-flight call for `key`, starting it with `factory` if there is none.
+
+        Results are shared by reference between callers, so they should be
+        treated as read-only.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(factory()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+            logger.debug(f"{self.name}: joined in-flight call {key[:12]}")
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            # Only the last waiter to leave cancels the shared work; it is
+            # forgotten first so later callers start a fresh call instead of
+            # joining the cancelled one
+            if call.waiters == 1 and not call.task.done():
+                self._forget(key, call)
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: str, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+
+def request_key(*parts: Any, **params: Any) -> str:
+    """Stable hash of a request's identifying parts (e.g. provider, model, messages, sampling params)."""
+    payload = json.dumps([parts, params], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# Shared by every LLMService instance: identical concurrent completions hit the provider once
+llm_single_flight = SingleFlight("llm")
+
+
+def _collect_single_flight_metrics():
+    """Expose LLM request coalescing on /api/metrics."""
+    yield "llm_single_flight_in_flight", "Distinct LLM completions in flight", "gauge", [
+        ({}, llm_single_flight.in_flight)
+    ]
+    yield "llm_single_flight_requests_total", "LLM completions by whether they started or joined a call", "counter", [
+        ({"result": "executed"}, llm_single_flight.executions),
+        ({"result": "coalesced"}, llm_single_flight.coalesced),
+    ]
+
+
+registry.register_collector(_collect_single_flight_metrics)
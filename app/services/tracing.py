@@ -0,0 +1,264 @@
+"""
+Lightweight request tracing.
+
+Spans are tracked through a contextvar, so nested calls within a request (and
+tasks spawned from it) are parented automatically:
+
+    with span("chat.send_message", conversation_id=conversation_id):
+        ...
+
+    @traced("llm.generate_response")
+    async def generate_response(...): ...
+
+    @trace_methods("chat_repository")
+    class ChatRepository: ...
+
+Every finished span is recorded in the app_stage_duration_seconds histogram
+exposed by /api/metrics. When settings.TRACING_EXPORT_PATH is set, sampled
+traces are also written as OTLP/JSON lines (one ExportTraceServiceRequest per
+line, the format read by the OpenTelemetry collector's otlpjsonfile receiver)
+by a background thread, so exporting never blocks the event loop.
+"""
+import atexit
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from app.config import settings
+from app.services.metrics import stage_duration
+
+logger = logging.getLogger(__name__)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "sampled", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        # The sampling decision is made once per trace, at the root span
+        self.sampled = parent.sampled if parent else random.random() < settings.TRACING_SAMPLE_RATE
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = dict(attributes or {})
+        self.status = "ok"
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds (so far, if the span hasn't ended)."""
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def end(self):
+        self.end_ns = time.time_ns()
+        stage_duration.observe(self.duration, stage=self.name, status=self.status)
+        if self.sampled and _exporter is not None:
+            _exporter.export(self)
+
+
+def current_span() -> Optional[Span]:
+    """The active span in this context, if any."""
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Run a block inside a child span of the current span (or a new trace)."""
+    if not settings.TRACING_ENABLED:
+        yield Span(name, attributes=attributes)
+        return
+
+    current = Span(name, parent=_current_span.get(), attributes=attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "error"
+        current.set_attribute("exception.type", type(e).__name__)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator running a function (sync, async or async generator) inside a span."""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        if inspect.isasyncgenfunction(func):
+            @functools.wraps(func)
+            async def asyncgen_wrapper(*args, **kwargs):
+                # The span isn't made current: the generator is resumed from
+                # the consumer's context, which may differ between iterations
+                stream_span = Span(span_name, parent=_current_span.get())
+                first_item = True
+                agen = func(*args, **kwargs)
+                try:
+                    async for item in agen:
+                        if first_item:
+                            stream_span.set_attribute("time_to_first_item_ms", round(stream_span.duration * 1000, 2))
+                            first_item = False
+                        yield item
+                except GeneratorExit:
+                    # Consumer stopped early (e.g. client disconnected); not an error
+                    raise
+                except BaseException as e:
+                    stream_span.status = "error"
+                    stream_span.set_attribute("exception.type", type(e).__name__)
+                    raise
+                finally:
+                    try:
+                        # Close the wrapped generator now rather than when it is
+                        # garbage collected, so its own cleanup runs in order
+                        await agen.aclose()
+                    finally:
+                        if settings.TRACING_ENABLED:
+                            stream_span.end()
+            return asyncgen_wrapper
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def sync_wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return sync_wrapper
+
+    return decorator
+
+
+def trace_methods(prefix: str) -> Callable[[type], type]:
+    """Class decorator tracing every public coroutine / async generator method as '<prefix>.<method>'."""
+    def decorator(cls: type) -> type:
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith("_"):
+                continue
+            if inspect.iscoroutinefunction(value) or inspect.isasyncgenfunction(value):
+                setattr(cls, attr, traced(f"{prefix}.{attr}")(value))
+        return cls
+    return decorator
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(finished: Span) -> Dict[str, Any]:
+    otlp = {
+        "traceId": finished.trace_id,
+        "spanId": finished.span_id,
+        "name": finished.name,
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(finished.start_ns),
+        "endTimeUnixNano": str(finished.end_ns),
+        "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in finished.attributes.items()],
+        "status": {"code": 2 if finished.status == "error" else 1},
+    }
+    if finished.parent_id:
+        otlp["parentSpanId"] = finished.parent_id
+    return otlp
+
+
+class JsonLinesSpanExporter:
+    """Writes finished spans as OTLP/JSON lines from a background thread."""
+
+    def __init__(self, path: str, service_name: str, batch_size: int = 256):
+        self.path = path
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self._queue: "queue.SimpleQueue[Optional[Span]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._thread.start()
+
+    def export(self, finished: Span):
+        self._queue.put(finished)
+
+    def shutdown(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _envelope(self, spans) -> str:
+        return json.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": "app.services.tracing"}, "spans": [_otlp_span(s) for s in spans]}],
+            }]
+        })
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                item = self._queue.get()
+                batch = []
+                stop = item is None
+                if item is not None:
+                    batch.append(item)
+                # Drain whatever else is queued into the same line
+                while not stop and len(batch) < self.batch_size:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                    else:
+                        batch.append(item)
+                if batch:
+                    try:
+                        f.write(self._envelope(batch) + "\n")
+                        f.flush()
+                    except Exception as e:
+                        logger.error(f"Error exporting spans: {str(e)}")
+                if stop:
+                    return
+
+
+_exporter: Optional[JsonLinesSpanExporter] = None
+
+
+def init_tracing():
+    """Start the span exporter if TRACING_EXPORT_PATH is configured. Called on startup."""
+    global _exporter
+    if settings.TRACING_ENABLED and settings.TRACING_EXPORT_PATH and _exporter is None:
+        _exporter = JsonLinesSpanExporter(settings.TRACING_EXPORT_PATH, settings.APP_NAME)
+        atexit.register(shutdown_tracing)
+        logger.info(f"Exporting traces to {settings.TRACING_EXPORT_PATH} (sample rate {settings.TRACING_SAMPLE_RATE})")
+
+
+def shutdown_tracing():
+    """Flush and stop the span exporter. Called on shutdown."""
+    global _exporter
+    if _exporter is not None:
+        _exporter.shutdown()
+        _exporter = None
@@ -0,0 +1,88 @@
+"""
+Benchmark per-user dataset lookup: boolean-mask scan vs. UserIndexedFrame.
+
+Builds synthetic transaction tables of increasing size and measures the cost
+of fetching one user's rows the old way (`df[df['user_id'] == user_id]`) and
+through the precomputed user_id index used by MetaPromptGenerator.
+
+Usage:
+    python -m benchmarks.bench_user_index
+    python -m benchmarks.bench_user_index --sizes 10000 1000000 5000000 --json results.json
+"""
+import argparse
+import json
+import time
+from typing import Dict, Any, List
+
+import numpy as np
+import pandas as pd
+
+from app.models.user_index import UserIndexedFrame
+
+
+def make_transactions(rows: int, rows_per_user: int = 50, seed: int = 0) -> pd.DataFrame:
+    """Create a synthetic transaction table shaped like data/transaction_data.csv."""
+    rng = np.random.default_rng(seed)
+    users = max(rows // rows_per_user, 1)
+    return pd.DataFrame({
+        "user_id": rng.integers(1, users + 1, size=rows),
+        "transaction_id": np.arange(rows),
+        "amount": rng.uniform(1, 2000, size=rows).round(2),
+        "category": rng.choice(["Food & Dining", "Housing", "Shopping", "Travel", "Utilities"], size=rows),
+    })
+
+
+def time_per_call(fn, user_ids: List[int]) -> float:
+    """Average seconds per call of fn over the given user IDs."""
+    start = time.perf_counter()
+    for user_id in user_ids:
+        fn(user_id)
+    return (time.perf_counter() - start) / len(user_ids)
+
+
+def run(sizes: List[int], lookups: int) -> List[Dict[str, Any]]:
+    results = []
+    for size in sizes:
+        df = make_transactions(size)
+        user_ids = df["user_id"].sample(n=lookups, replace=True, random_state=1).tolist()
+
+        build_start = time.perf_counter()
+        index = UserIndexedFrame(df)
+        build_seconds = time.perf_counter() - build_start
+
+        # Fewer mask-scan lookups on big tables; each one is a full scan
+        scan_ids = user_ids[: max(5, lookups // max(size // 100_000, 1))]
+        scan = time_per_call(lambda user_id: df[df["user_id"] == user_id].to_dict("records"), scan_ids)
+        indexed = time_per_call(lambda user_id: index.records(str(user_id)), user_ids)
+
+        result = {
+            "rows": size,
+            "index_build_ms": round(build_seconds * 1000, 2),
+            "mask_scan_us": round(scan * 1e6, 1),
+            "indexed_us": round(indexed * 1e6, 1),
+            "speedup": round(scan / indexed, 1) if indexed > 0 else None,
+        }
+        results.append(result)
+        print(
+            f"{size:>10,} rows | build {result['index_build_ms']:>9.2f} ms | "
+            f"mask scan {result['mask_scan_us']:>10.1f} us | indexed {result['indexed_us']:>8.1f} us | "
+            f"x{result['speedup']}"
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000, 4_000_000])
+    parser.add_argument("--lookups", type=int, default=200, help="Lookups timed per table size")
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.lookups)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,479 @@
+"""
+End-to-end load test for the API.
+
+Boots `app.main:app` in-process (httpx ASGITransport, no network) against the
+mock database and the in-process stub LLM provider (or the instant mock
+provider with --llm mock), seeds a synthetic user base, then
+drives concurrent traffic at the hot endpoints and reports p50/p95/p99
+latency, throughput and allocations for each.
+
+Latency and throughput come from a timed pass; allocations come from a
+separate, shorter pass under tracemalloc so tracing overhead doesn't skew the
+timings.
+
+Usage:
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --requests 500 --concurrency 32 --json results/run.json
+    python -m benchmarks.load_test --compare results/baseline.json --max-regression 10
+    python -m benchmarks.load_test --endpoints send_message --stub-ttft-ms 800 --stub-429-period 10 --stub-429-burst 2
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import platform
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+# Must be set before app.config is imported
+os.environ.setdefault("ENABLE_MOCK_DATA", "True")
+
+ENDPOINTS = ("conversations_list", "send_message", "financial_profile", "recommendations", "image_upload")
+
+# Modules whose auth/database dependencies are overridden for the benchmark user
+_DEPENDENCY_MODULES = (
+    "app.dependencies",
+    "app.auth",
+    "app.api.auth",
+    "app.database",
+    "app.database.mongodb",
+    "app.database.connection",
+)
+
+
+def make_png(width: int = 64, height: int = 64) -> bytes:
+    """A small valid grayscale PNG, so uploads don't depend on fixture files."""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    rows = b"".join(b"\x00" + bytes((x * 4) % 256 for x in range(width)) for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class HashingEmbedder:
+    """Deterministic bag-of-words embedder standing in for sentence-transformers."""
+
+    dimensions = 256
+
+    def encode(self, texts, normalize_embeddings=True, convert_to_numpy=True, **kwargs):
+        import numpy as np
+
+        embeddings = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in str(text).lower().split():
+                embeddings[row, zlib.crc32(word.encode("utf-8")) % self.dimensions] += 1.0
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings /= np.where(norms == 0, 1.0, norms)
+        return embeddings
+
+
+def install_embedding_fallback() -> Optional[str]:
+    """
+    Use HashingEmbedder when sentence-transformers isn't installed.
+
+    Without it, RecommendationEngine fails to build its product index and
+    replaces the products file with samples. The fallback index is written to
+    a temporary directory so it never mixes with real model indexes.
+
+    Returns:
+        The fallback index directory, or None if the real model is used
+    """
+    try:
+        importlib.import_module("sentence_transformers")
+        return None
+    except ImportError:
+        pass
+
+    from app.config import settings
+    from app.models import embedding_index
+
+    settings.EMBEDDING_INDEX_DIR = tempfile.mkdtemp(prefix="load-test-embeddings-")
+    embedding_index.get_embedding_model = HashingEmbedder
+    print(f"sentence-transformers is not installed; recommendations use a hashing embedder "
+          f"(index in {settings.EMBEDDING_INDEX_DIR})")
+    return settings.EMBEDDING_INDEX_DIR
+
+
+def build_app(user):
+    """Import the application and wire it to the benchmark user and the mock database."""
+    from fastapi import APIRouter
+
+    try:
+        from app.main import app
+    except ImportError as e:
+        # Measure the real application or nothing, never a patched-up copy
+        raise SystemExit(
+            f"Cannot import app.main: {e}. The load test runs the application as it is, "
+            f"so every module it imports must exist in this tree."
+        ) from e
+    from app.database import mongodb
+
+    # Routers that app.main doesn't register yet are mounted so their hot paths are measured too
+    paths = {getattr(route, "path", "") for route in app.routes}
+    extra_routers = {"app.api.financial": "/api/financial", "app.api.images": "/api/images"}
+    for module_name, prefix in extra_routers.items():
+        if not any(path.startswith(prefix) for path in paths):
+            router: APIRouter = importlib.import_module(module_name).router
+            app.include_router(router, prefix="/api")
+
+    async def current_user():
+        return user
+
+    async def database():
+        return mongodb.mock_db
+
+    for module_name in _DEPENDENCY_MODULES:
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            continue
+        for name in ("get_current_user", "get_current_active_user"):
+            if hasattr(module, name):
+                app.dependency_overrides[getattr(module, name)] = current_user
+        if hasattr(module, "get_database"):
+            app.dependency_overrides[module.get_database] = database
+
+    return app
+
+
+async def seed(db, user_id: str, users: int, transactions_per_user: int, conversations: int, messages: int) -> Dict[str, Any]:
+    """Seed financial data for `users` users (the benchmark user first) and their chat history."""
+    from app.models.chat import ChatMessageCreate, ConversationCreate
+    from app.repository.chat_repository import ChatRepository
+    from app.repository.financial_repository import FinancialRepository
+
+    financial_repo = FinancialRepository(db)
+    chat_repo = ChatRepository(db)
+    await financial_repo.create_indexes()
+    await chat_repo.create_indexes()
+
+    user_ids = [user_id] + [f"user-{i}" for i in range(1, users)]
+    # Midnight, since the models' date fields reject datetimes with a time part
+    today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    categories = ["Food & Dining", "Housing", "Shopping", "Travel", "Utilities"]
+
+    await financial_repo.bulk_load_demographics([
+        {"user_id": uid, "age": 25 + i % 40, "gender": "Female" if i % 2 else "Male", "occupation": "Engineer",
+         "annual_income": 50000 + i * 10, "education_level": "Bachelor's", "city": "Austin", "state": "TX",
+         "marital_status": "Single", "dependents": i % 3}
+        for i, uid in enumerate(user_ids)
+    ])
+    await financial_repo.bulk_load_accounts([
+        {"user_id": uid, "account_type": "checking", "account_balance": 5000.0 + i, "savings_balance": 12000.0,
+         "account_opening_date": today - timedelta(days=2000), "checking_account_number": f"{100000 + i}",
+         "savings_account_number": f"{200000 + i}"}
+        for i, uid in enumerate(user_ids)
+    ])
+    await financial_repo.bulk_load_credit_history([
+        {"user_id": uid, "credit_score": 650 + i % 150, "outstanding_debt": 1500.0, "credit_utilization": 30,
+         "payment_history": "Good", "credit_age_years": 8, "recent_inquiries": 1, "delinquencies": 0,
+         "total_accounts": 4}
+        for i, uid in enumerate(user_ids)
+    ])
+    await financial_repo.bulk_load_investments([
+        {"user_id": uid, "investment_id": i, "investment_type": "etfs", "amount": 5000.0, "current_value": 5400.0,
+         "start_date": today - timedelta(days=400)}
+        for i, uid in enumerate(user_ids)
+    ])
+    transaction_id = 0
+    for uid in user_ids:
+        batch = []
+        for j in range(transactions_per_user):
+            transaction_id += 1
+            batch.append({
+                "user_id": uid, "transaction_id": transaction_id, "date": today - timedelta(days=j % 90),
+                "amount": 10.0 + (j * 7) % 500, "merchant": "Merchant", "category": categories[j % len(categories)],
+                "transaction_type": "debit",
+            })
+        await financial_repo.bulk_load_transactions(batch)
+
+    # A meta-prompt sends recommendations through the engine's retrieval and cache path
+    await db.meta_prompts.insert_one({
+        "user_id": user_id,
+        "prompt_text": "Salaried engineer in their thirties with steady savings, building an emergency fund "
+                       "and starting to invest for retirement.",
+        "created_at": today,
+        "updated_at": today,
+    })
+
+    conversation_ids = []
+    for i in range(conversations):
+        conversation = await chat_repo.create_conversation(ConversationCreate(user_id=user_id, title=f"Conversation {i}"), user_id)
+        conversation_id = str(conversation.id)
+        conversation_ids.append(conversation_id)
+        for j in range(messages):
+            await chat_repo.create_message(ChatMessageCreate(
+                conversation_id=conversation_id,
+                role="user" if j % 2 == 0 else "assistant",
+                content=f"Message {j} about my budget and savings goals.",
+            ))
+
+    return {"conversation_ids": conversation_ids}
+
+
+def make_scenarios(fixtures: Dict[str, Any]) -> Dict[str, Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]]:
+    """One request function per benchmarked endpoint."""
+    conversation_ids = fixtures["conversation_ids"]
+    png = make_png()
+
+    async def conversations_list(client, i):
+        return await client.get("/api/chat/conversations", params={"limit": 20})
+
+    async def send_message(client, i):
+        return await client.post("/api/chat/chat", json={
+            "conversation_id": conversation_ids[i % len(conversation_ids)],
+            "role": "user",
+            "content": "How much did I spend on dining last month?",
+        })
+
+    async def financial_profile(client, i):
+        return await client.get("/api/financial/financial-profile")
+
+    async def recommendations(client, i):
+        return await client.get("/api/recommendations/")
+
+    async def image_upload(client, i):
+        return await client.post(
+            "/api/images/upload",
+            files={"file": (f"receipt-{i}.png", png, "image/png")},
+            data={"analysis_type": "receipt"},
+        )
+
+    return {
+        "conversations_list": conversations_list,
+        "send_message": send_message,
+        "financial_profile": financial_profile,
+        "recommendations": recommendations,
+        "image_upload": image_upload,
+    }
+
+
+async def drive(client, request_fn, requests: int, concurrency: int) -> Dict[str, Any]:
+    """Issue `requests` calls with at most `concurrency` in flight and collect latencies."""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    counter = iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                response = await request_fn(client, i)
+                status = str(response.status_code)
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1) if elapsed > 0 else 0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0,
+        "error_rate": round(errors / requests, 4) if requests else 0,
+        "statuses": statuses,
+    }
+
+
+async def measure_allocations(client, request_fn, requests: int) -> Dict[str, Any]:
+    """Traced-memory growth and peak over sequential requests."""
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for i in range(requests):
+            await request_fn(client, i)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "alloc_requests": requests,
+        "retained_kib_per_request": round((current - baseline) / 1024 / requests, 2) if requests else 0,
+        "peak_kib": round((peak - baseline) / 1024, 1),
+    }
+
+
+async def run(args) -> Dict[str, Any]:
+    from bson import ObjectId
+    from app.models.user import User
+
+    user_oid = ObjectId()
+    user = User(_id=user_oid, user_id="bench-user", email="bench@example.com", full_name="Bench User")
+    app = build_app(user)
+    embedding_fallback = install_embedding_fallback()
+
+    results: Dict[str, Any] = {}
+    async with app.router.lifespan_context(app):
+        from app.database import mongodb
+        fixtures = await seed(
+            mongodb.mock_db, str(user_oid), args.users, args.transactions_per_user,
+            args.conversations, args.messages
+        )
+        scenarios = make_scenarios(fixtures)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            for name in args.endpoints:
+                request_fn = scenarios[name]
+                await drive(client, request_fn, args.warmup, min(args.concurrency, args.warmup or 1))
+                result = await drive(client, request_fn, args.requests, args.concurrency)
+                if args.alloc_requests:
+                    result.update(await measure_allocations(client, request_fn, args.alloc_requests))
+                results[name] = result
+                print(
+                    f"{name:<20} | {result['throughput_rps']:>8.1f} req/s | p50 {result['p50_ms']:>8.2f} ms | "
+                    f"p95 {result['p95_ms']:>8.2f} ms | p99 {result['p99_ms']:>8.2f} ms | "
+                    f"err {result['error_rate']:.2%} | peak {result.get('peak_kib', 0):>8.1f} KiB"
+                )
+
+        from app.services.http_clients import get_pool_stats
+        from app.services.llm_stub import get_stub_stats
+        llm_stats = {"pools": get_pool_stats(), "stub": get_stub_stats()}
+
+    if llm_stats["stub"]:
+        print(f"stub LLM: {llm_stats['stub']}")
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "python": platform.python_version(),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "users": args.users,
+            "transactions_per_user": args.transactions_per_user,
+            "conversations": args.conversations,
+            "messages": args.messages,
+            "llm_provider": args.llm,
+            "embedding_model": "hashing" if embedding_fallback else "sentence-transformers",
+            "stub": {
+                "ttft_ms": args.stub_ttft_ms,
+                "tokens_per_second": args.stub_tokens_per_second,
+                "response_tokens": args.stub_response_tokens,
+                "error_rate": args.stub_error_rate,
+                "rate_limit_period_seconds": args.stub_429_period,
+                "rate_limit_burst_seconds": args.stub_429_burst,
+            } if args.llm == "stub" else None,
+        },
+        "endpoints": results,
+        "llm": llm_stats,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], max_regression: Optional[float]) -> bool:
+    """Print per-endpoint changes against a baseline run; return False if p95 regressed past the limit."""
+    ok = True
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} ({baseline.get('timestamp', '?')}):")
+    for name, result in current["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(name)
+        if not base:
+            print(f"{name:<20} | no baseline")
+            continue
+        changes = []
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            if base.get(metric):
+                change = (result[metric] - base[metric]) / base[metric] * 100
+                changes.append(f"{metric} {change:+6.1f}%")
+        print(f"{name:<20} | " + " | ".join(changes))
+
+        if max_regression is not None and base.get("p95_ms"):
+            regression = (result["p95_ms"] - base["p95_ms"]) / base["p95_ms"] * 100
+            if regression > max_regression:
+                print(f"{name:<20} | p95 regressed {regression:.1f}% (limit {max_regression}%)")
+                ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument("--requests", type=int, default=200, help="Timed requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight per endpoint")
+    parser.add_argument("--warmup", type=int, default=20, help="Untimed requests per endpoint before measuring")
+    parser.add_argument("--alloc-requests", type=int, default=50, help="Requests traced for allocations (0 to skip)")
+    parser.add_argument("--users", type=int, default=1000, help="Seeded users")
+    parser.add_argument("--transactions-per-user", type=int, default=50)
+    parser.add_argument("--conversations", type=int, default=20, help="Seeded conversations for the benchmark user")
+    parser.add_argument("--messages", type=int, default=20, help="Seeded messages per conversation")
+    parser.add_argument("--llm", choices=("stub", "mock"), default="stub", help="LLM provider used by the app")
+    parser.add_argument("--stub-ttft-ms", type=float, default=300.0, help="Stub time to first token")
+    parser.add_argument("--stub-tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--stub-response-tokens", type=int, default=120)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0, help="Fraction of stub calls failing with 500")
+    parser.add_argument("--stub-429-period", type=float, default=0.0, help="Seconds between stub 429 bursts (0 disables)")
+    parser.add_argument("--stub-429-burst", type=float, default=0.0, help="Length of each stub 429 burst in seconds")
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file")
+    parser.add_argument("--compare", dest="baseline_path", help="Compare against a previous --json result")
+    parser.add_argument("--max-regression", type=float, help="Exit non-zero if any p95 regresses by more than this %%")
+    args = parser.parse_args()
+
+    # Configure the app's LLM provider before app.config is first imported
+    os.environ["LLM_PROVIDER"] = args.llm
+    # Blank provider credentials (load_dotenv doesn't override them), so no
+    # route, fallback or vision call can reach a real, billed provider
+    for name in ("OPENAI_API_KEY", "MISTRAL_API_KEY", "HUGGINGFACE_TOKEN"):
+        os.environ[name] = ""
+    os.environ["LLM_STUB_TTFT_MS"] = str(args.stub_ttft_ms)
+    os.environ["LLM_STUB_TOKENS_PER_SECOND"] = str(args.stub_tokens_per_second)
+    os.environ["LLM_STUB_RESPONSE_TOKENS"] = str(args.stub_response_tokens)
+    os.environ["LLM_STUB_ERROR_RATE"] = str(args.stub_error_rate)
+    os.environ["LLM_STUB_RATE_LIMIT_PERIOD_SECONDS"] = str(args.stub_429_period)
+    os.environ["LLM_STUB_RATE_LIMIT_BURST_SECONDS"] = str(args.stub_429_burst)
+
+    results = asyncio.run(run(args))
+
+    if args.json_path:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json_path)), exist_ok=True)
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline_path:
+        with open(args.baseline_path) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()